@@ -2,6 +2,9 @@
 from decimal import Decimal
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
+from django.db.models import F
+from config.admin_utils import EstimatedCountPaginator, UserInputFilter, input_filter
+from .backends import forget_cached_users
 from .models import User
 from .models import Payment
 
@@ -14,6 +17,8 @@ class UserAdmin(DjangoUserAdmin):
     list_filter = ("is_staff", "is_active")
     search_fields = ("email", "public_id")
     ordering = ("email",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     # (Optional) inline list editing of 'credits':
     list_editable = ("credits",)          # enable editing credits from list
@@ -21,7 +26,7 @@ class UserAdmin(DjangoUserAdmin):
 
     # DETAIL PAGE (user edit)
     fieldsets = (
-        (None, {"fields": ("email", "password", "public_id", "credits")}),
+        (None, {"fields": ("email", "password", "public_id", "credits", "code_template")}),
         ("Permissions", {"fields": ("is_active", "is_staff", "is_superuser", "groups", "user_permissions")}),
         ("Important dates", {"fields": ("last_login", "date_joined")}),
     )
@@ -51,20 +56,28 @@ class UserAdmin(DjangoUserAdmin):
 
     @admin.action(description="Set credits to 0")
     def zero_credits(self, request, queryset):
-        for u in queryset:
-            u.credits = Decimal("0")
-            u.save(update_fields=["credits"])
+        self._set_credits(request, queryset, Decimal("0"))
 
     def _topup(self, request, queryset, amount: Decimal):
-        for u in queryset:
-            u.credits = (u.credits or Decimal("0")) + amount
-            u.save(update_fields=["credits"])
+        self._set_credits(request, queryset, F("credits") + amount)
+
+    def _set_credits(self, request, queryset, value):
+        # one UPDATE for the whole selection instead of a save() per user;
+        # ids are read first so "select all" drops every cached user too
+        ids = list(queryset.values_list("pk", flat=True))
+        updated = queryset.update(credits=value)
+        forget_cached_users(ids)
+        self.message_user(request, f"Updated credits for {updated} user(s).")
 
 
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ("razorpay_order_id", "user", "credits", "amount_paise", "status", "created_at")
-    list_filter = ("status", "currency")
+    list_select_related = ("user",)
+    list_filter = ("status", input_filter("currency", "currency"), UserInputFilter)
+    autocomplete_fields = ("user",)
     search_fields = ("razorpay_order_id", "razorpay_payment_id", "user__email")
     ordering = ("-created_at",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -1,6 +1,26 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from . import backends
+        backends.connect_signals()
+        checks.register(check_user_cache_is_shared)
+
+
+def check_user_cache_is_shared(app_configs, **kwargs):
+    """Invalidation only reaches the cache it runs against, so the user cache must be shared."""
+    from django.conf import settings
+
+    if settings.AUTH_USER_CACHE_TTL > 0 and settings.CACHES["default"]["BACKEND"] in settings.PROCESS_LOCAL_CACHES:
+        return [checks.Warning(
+            "AUTH_USER_CACHE_TTL is set but the default cache is per-process; other workers "
+            "keep serving a user's old credits for up to AUTH_USER_CACHE_TTL seconds after a change.",
+            hint="Point DJANGO_CACHE_BACKEND at a shared cache (redis/memcached) or set AUTH_USER_CACHE_TTL=0.",
+            id="accounts.W001",
+        )]
+    return []
@@ -0,0 +1,76 @@
+# accounts/backends.py
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_save, post_delete
+
+
+def _user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def forget_cached_user(user_id):
+    """Drop the cached user; call after updating a user without .save()."""
+    cache.delete(_user_cache_key(user_id))
+
+
+def forget_cached_users(user_ids):
+    cache.delete_many([_user_cache_key(pk) for pk in user_ids])
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that keeps the session's user in the cache for
+    AUTH_USER_CACHE_TTL seconds, so authenticated requests skip the
+    per-request user lookup. The cached copy is read from the primary: a
+    replica's copy could be stale for the whole TTL, not just the lag.
+    """
+
+    def _primary_users(self):
+        return get_user_model()._default_manager.using(DEFAULT_DB_ALIAS)
+
+    def get_user(self, user_id):
+        if settings.AUTH_USER_CACHE_TTL <= 0:
+            return super().get_user(user_id)
+        key = _user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            try:
+                user = self._primary_users().get(pk=user_id)
+            except ObjectDoesNotExist:
+                return None
+            if not self.user_can_authenticate(user):
+                return None
+            cache.set(key, user, settings.AUTH_USER_CACHE_TTL)
+        return user
+
+    async def aget_user(self, user_id):
+        # request.auser() (async views) comes here, not through get_user()
+        if settings.AUTH_USER_CACHE_TTL <= 0:
+            return await super().aget_user(user_id)
+        key = _user_cache_key(user_id)
+        user = await cache.aget(key)
+        if user is None:
+            try:
+                user = await self._primary_users().aget(pk=user_id)
+            except ObjectDoesNotExist:
+                return None
+            if not self.user_can_authenticate(user):
+                return None
+            await cache.aset(key, user, settings.AUTH_USER_CACHE_TTL)
+        return user
+
+
+def _invalidate(sender, instance, **kwargs):
+    # after commit, so a concurrent request can't re-cache the old row
+    pk = instance.pk
+    transaction.on_commit(lambda: forget_cached_user(pk))
+
+
+def connect_signals():
+    """Drop the cached user whenever the row changes (called from AccountsConfig.ready)."""
+    post_save.connect(_invalidate, sender=settings.AUTH_USER_MODEL, dispatch_uid="accounts_user_cache_save")
+    post_delete.connect(_invalidate, sender=settings.AUTH_USER_MODEL, dispatch_uid="accounts_user_cache_delete")
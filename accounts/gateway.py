@@ -0,0 +1,88 @@
+# accounts/gateway.py
+"""
+Razorpay calls used by the payment views.
+
+The sync helpers go through the official SDK; the async ones talk to the
+REST API with httpx so a slow gateway doesn't hold a worker thread.
+
+Both libraries are imported on first use rather than at module load
+(together they are ~0.2s of every worker's startup), so only the processes
+that actually talk to Razorpay pay for them. `preload()` imports them up
+front for servers that fork workers from a preloaded master.
+"""
+import asyncio
+import hashlib
+import hmac
+import importlib
+import weakref
+
+from django.conf import settings
+
+RAZORPAY_API = "https://api.razorpay.com/v1"
+GATEWAY_TIMEOUT = 15  # seconds
+
+_client = None
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> httpx.AsyncClient
+
+
+def _auth():
+    return (settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
+
+
+def get_client():
+    """The process-wide razorpay.Client, importing the SDK on first call."""
+    global _client
+    if _client is None:
+        import razorpay
+        _client = razorpay.Client(auth=_auth())
+    return _client
+
+
+def preload():
+    """Import the gateway libraries now (see config/gunicorn.py)."""
+    importlib.import_module("httpx")
+    importlib.import_module("razorpay")
+
+
+def create_order(payload):
+    return get_client().order.create(payload)
+
+
+def verify_payment_signature(order_id: str, payment_id: str, signature: str) -> bool:
+    """Checkout's order|payment HMAC, checked through the SDK."""
+    from razorpay.errors import SignatureVerificationError
+    try:
+        get_client().utility.verify_payment_signature({
+            "razorpay_order_id": order_id,
+            "razorpay_payment_id": payment_id,
+            "razorpay_signature": signature,
+        })
+    except SignatureVerificationError:
+        return False
+    return True
+
+
+def _get_async_client():
+    # an AsyncClient's pool belongs to the loop that opened it, so each loop
+    # (one per uvicorn worker; one per call under async_to_sync) gets its own,
+    # dropped along with the loop
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        import httpx
+        client = _async_clients[loop] = httpx.AsyncClient(
+            base_url=RAZORPAY_API, auth=_auth(), timeout=GATEWAY_TIMEOUT,
+        )
+    return client
+
+
+async def acreate_order(payload):
+    r = await _get_async_client().post("/orders", json=payload)
+    r.raise_for_status()
+    return r.json()
+
+
+def verify_webhook_signature(body: str, signature: str, secret: str) -> bool:
+    """Same HMAC check as razorpay.Utility.verify_webhook_signature, without the SDK."""
+    expected = hmac.new(secret.encode(), body.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature or "")
@@ -0,0 +1,17 @@
+# accounts/management/commands/rebuild_usage.py
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import usage
+from labels.archive import SegmentMissing
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily usage rollups from labels and paid payments."
+
+    def handle(self, *args, **opts):
+        try:
+            n = usage.rebuild()
+        except SegmentMissing as e:
+            # rebuilding without the archived labels would undercount usage
+            raise CommandError(str(e)) from e
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {n} daily usage row(s)."))
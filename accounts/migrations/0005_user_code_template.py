@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:31
+
+import labels.codes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_payment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='code_template',
+            field=models.CharField(blank=True, max_length=200, validators=[labels.codes.validate_code_template]),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_code_template'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsageDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('labels_created', models.PositiveIntegerField(default=0)),
+                ('credits_spent', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('credits_purchased', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['user', 'id'], name='accounts_pa_user_id_f9a1e4_idx'),
+        ),
+        migrations.AddField(
+            model_name='usagedaily',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_days', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='usagedaily',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='uniq_usage_user_day'),
+        ),
+    ]
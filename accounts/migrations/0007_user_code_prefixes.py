@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_usagedaily'),
+    ]
+
+    # existing accounts get null (history unknown), only new ones start empty
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='code_prefixes',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='code_prefixes',
+            field=models.JSONField(blank=True, default=list, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:05
+
+import gzip
+import json
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+
+def backfill(apps, schema_editor):
+    # accounts.usage.rebuild() as of this migration, on the historical models,
+    # so existing accounts see their history on /accounts/usage/ straight away
+    db = schema_editor.connection.alias
+    Label = apps.get_model("labels", "Label")
+    LabelArchiveSegment = apps.get_model("labels", "LabelArchiveSegment")
+    Payment = apps.get_model("accounts", "Payment")
+    UsageDaily = apps.get_model("accounts", "UsageDaily")
+
+    totals = defaultdict(lambda: [0, Decimal("0"), Decimal("0")])
+    hot = (Label.objects.using(db).annotate(day=TruncDate("created_at"))
+           .values("user_id", "day").annotate(n=Count("id"), spent=Sum("credits_charged")).order_by())
+    for row in hot:
+        t = totals[(row["user_id"], row["day"])]
+        t[0] += row["n"]
+        t[1] += row["spent"]
+
+    seen = set()
+    for seg in LabelArchiveSegment.objects.using(db).order_by("id").iterator():
+        path = Path(settings.LABEL_ARCHIVE_DIR) / seg.path
+        if not path.exists():
+            raise RuntimeError(f"Archive segment {path} is missing; mount LABEL_ARCHIVE_DIR before migrating")
+        # a segment is a run of gzip members, which decompress as one stream
+        rows = [json.loads(line) for line in gzip.decompress(path.read_bytes()).splitlines()]
+        rows = [r for r in rows if r["id"] not in seen]
+        seen.update(r["id"] for r in rows)
+        still_hot = set(Label.objects.using(db).filter(pk__in=[r["id"] for r in rows]).values_list("pk", flat=True))
+        for r in rows:
+            if r["id"] in still_hot:
+                continue
+            t = totals[(r["user_id"], timezone.localdate(datetime.fromisoformat(r["created_at"])))]
+            t[0] += 1
+            t[1] += Decimal(r.get("credits_charged", "0.1"))
+
+    paid = (Payment.objects.using(db).filter(status="paid")
+            .annotate(day=TruncDate(Coalesce("processed_at", "created_at")))
+            .values("user_id", "day").annotate(credits=Sum("credits")).order_by())
+    for row in paid:
+        totals[(row["user_id"], row["day"])][2] += Decimal(row["credits"])
+
+    UsageDaily.objects.using(db).all().delete()
+    UsageDaily.objects.using(db).bulk_create([
+        UsageDaily(user_id=user_id, day=day, labels_created=labels,
+                   credits_spent=spent, credits_purchased=purchased)
+        for (user_id, day), (labels, spent, purchased) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_user_code_prefixes'),
+        ('labels', '0006_labelarchivesegment_code_filter'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 # accounts/models.py
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
+from labels.codes import account_prefix, validate_code_template, validate_template_owner
 import uuid
 
 class UserManager(BaseUserManager):
@@ -32,6 +33,11 @@ class User(AbstractUser):
     email = models.EmailField(unique=True)
     public_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     credits = models.DecimalField(max_digits=10, decimal_places=2, default=0) 
+    # blank = settings.LABEL_CODE_TEMPLATE
+    code_template = models.CharField(max_length=200, blank=True, validators=[validate_code_template])
+    # account prefix of every template this account has issued codes under;
+    # null for accounts older than the field, whose history is unknown
+    code_prefixes = models.JSONField(null=True, default=list, blank=True, editable=False)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -42,6 +48,19 @@ class User(AbstractUser):
     def __str__(self):
         return self.email
 
+    def clean(self):
+        super().clean()
+        if self.code_template:
+            validate_template_owner(self)
+
+    def save(self, *args, **kwargs):
+        # a new account starts out with its current template's prefix, so its
+        # first api_create doesn't have to record it
+        if self._state.adding and self.code_prefixes == []:
+            prefix = account_prefix(self)
+            self.code_prefixes = [prefix] if prefix else []
+        super().save(*args, **kwargs)
+
 class Payment(models.Model):
     STATUS_CHOICES = [
         ("created", "Created"),
@@ -69,7 +88,25 @@ class Payment(models.Model):
         indexes = [
             models.Index(fields=["user", "status"]),
             models.Index(fields=["razorpay_order_id"]),
+            models.Index(fields=["user", "id"]),  # keyset pages of payments_history
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} • {self.razorpay_order_id} • {self.status}"
+
+
+class UsageDaily(models.Model):
+    """Per-user, per-day totals, kept current by accounts.usage.record_usage()."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="usage_days")
+    day = models.DateField()
+    labels_created = models.PositiveIntegerField(default=0)
+    credits_spent = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    credits_purchased = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="uniq_usage_user_day"),
         ]
 
     def __str__(self):
-        return f"{self.user.email} • {self.razorpay_order_id} • {self.status}"
\ No newline at end of file
+        return f"{self.user_id} • {self.day}"
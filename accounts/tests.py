@@ -1,3 +1,283 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import tempfile
+from base64 import b64encode
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from asgiref.sync import async_to_sync
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.core.cache import cache
+from django.test import TestCase, override_settings, tag
+from django.urls import reverse
+from django.utils import timezone
+
+from config.db_router import ReplicaRouter
+from config.testing import AsyncViewsURLConf, QueryBudgetMixin
+from labels import archive
+from labels.models import Label
+from . import usage
+from .apps import check_user_cache_is_shared
+from .backends import CachedModelBackend
+from .models import Payment, UsageDaily, User
+from .views import HISTORY_PAGE_SIZE
+
+
+class SignupTests(TestCase):
+    def test_signup_logs_the_new_user_in(self):
+        r = self.client.post(reverse("signup"), {
+            "email": "new@example.com", "password1": "a-Long-pass-123", "password2": "a-Long-pass-123",
+        }, secure=True)
+        self.assertRedirects(r, reverse("labels:home"), fetch_redirect_response=False)
+        user = User.objects.get(email="new@example.com")
+        self.assertEqual(self.client.session["_auth_user_id"], str(user.pk))
+        self.assertEqual(self.client.session["_auth_user_backend"], "accounts.backends.CachedModelBackend")
+
+
+class UserCacheCheckTests(TestCase):
+    def test_warns_when_the_user_cache_is_per_process(self):
+        with self.settings(AUTH_USER_CACHE_TTL=30):
+            self.assertEqual([w.id for w in check_user_cache_is_shared(None)], ["accounts.W001"])
+        with self.settings(AUTH_USER_CACHE_TTL=0):
+            self.assertEqual(check_user_cache_is_shared(None), [])
+        shared = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": ""}}
+        with self.settings(AUTH_USER_CACHE_TTL=30, CACHES=shared):
+            self.assertEqual(check_user_cache_is_shared(None), [])
+
+
+@override_settings(AUTH_USER_CACHE_TTL=30)
+class CachedBackendTests(TestCase):
+    def test_cache_is_filled_from_the_primary(self):
+        # a replica's copy could predate a credit update by the replica lag,
+        # and would then be served for the whole TTL
+        cache.clear()
+        user = User.objects.create_user("primary@example.com", "pw", credits=3)
+        with mock.patch.object(ReplicaRouter, "db_for_read", wraps=ReplicaRouter().db_for_read) as route:
+            self.assertEqual(CachedModelBackend().get_user(user.pk).credits, 3)
+            cache.clear()
+            self.assertEqual(async_to_sync(CachedModelBackend().aget_user)(user.pk).credits, 3)
+        route.assert_not_called()
+        self.assertIsNone(CachedModelBackend().get_user(user.pk + 1))
+
+
+class UserAdminActionTests(TestCase):
+    def test_select_all_top_up_drops_every_cached_user(self):
+        cache.clear()
+        admin = User.objects.create_superuser("admin@example.com", "pw")
+        users = [User.objects.create_user(f"u{i}@example.com", "pw", credits=1) for i in range(3)]
+        backend = CachedModelBackend()
+        for u in users:
+            backend.get_user(u.pk)
+        self.client.force_login(admin)
+        # "select all N" ticks only the visible page's first box
+        self.client.post(reverse("admin:accounts_user_changelist"), {
+            "action": "topup_5_credits", "select_across": "1", "index": "0",
+            ACTION_CHECKBOX_NAME: [users[0].pk],
+        }, secure=True)
+        self.assertEqual([backend.get_user(u.pk).credits for u in users], [6, 6, 6])
+
+
+class UsageRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("usage@example.com", "pw", credits=100)
+        self.client.force_login(self.user)
+
+    def test_api_create_updates_rollup_and_rebuild_agrees(self):
+        for units in (10, 5):
+            self.client.post(reverse("labels:api_create"), {
+                "name": "n", "units": str(units), "type": "t", "category": "c",
+            }, secure=True)
+        row = UsageDaily.objects.get(user=self.user)
+        self.assertEqual((row.labels_created, row.credits_spent), (15, Decimal("1.50")))
+        self.assertEqual(sum(Label.objects.values_list("credits_charged", flat=True)), Decimal("1.5"))
+
+        usage.rebuild()
+        row = UsageDaily.objects.get(user=self.user)
+        self.assertEqual((row.labels_created, row.credits_spent), (15, Decimal("1.50")))
+
+    def test_rebuild_counts_what_was_charged_on_the_day_it_was_created(self):
+        # an uncharged label (admin/shell) and a restored one from last year
+        Label.objects.create(user=self.user, name="free", sku_type="t", category="c", unit_index=1, code="free-1")
+        old = timezone.now() - timedelta(days=400)
+        with tempfile.TemporaryDirectory() as tmp, override_settings(LABEL_ARCHIVE_DIR=tmp):
+            for i in (1, 2):
+                Label.objects.create(user=self.user, name="old", sku_type="t", category="c",
+                                     unit_index=i, code=f"old-{i}", credits_charged=Decimal("0.1"))
+            Label.objects.filter(name="old").update(created_at=old)
+            archive.archive_batch(timezone.now())
+            self.assertEqual(archive.restore(["old-1"]), 1)
+            usage.rebuild()
+
+        rows = {r.day: (r.labels_created, r.credits_spent) for r in UsageDaily.objects.filter(user=self.user)}
+        self.assertEqual(rows, {
+            timezone.localdate(): (1, Decimal("0")),
+            timezone.localdate(old): (2, Decimal("0.2")),
+        })
+
+    def test_usage_and_payments_are_keyset_paginated(self):
+        today = date.today()
+        UsageDaily.objects.bulk_create([
+            UsageDaily(user=self.user, day=today - timedelta(days=i), labels_created=i)
+            for i in range(HISTORY_PAGE_SIZE + 5)
+        ])
+        r = self.client.get(reverse("usage"), secure=True)
+        self.assertEqual(len(r.context["days"]), HISTORY_PAGE_SIZE)
+        r = self.client.get(reverse("usage"), {"before": r.context["next_before"].isoformat()}, secure=True)
+        self.assertEqual([d.labels_created for d in r.context["days"]], list(range(HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE + 5)))
+        self.assertIsNone(r.context["next_before"])
+
+        Payment.objects.bulk_create([
+            Payment(user=self.user, credits=1, amount_paise=5000, razorpay_order_id=f"order_{i}")
+            for i in range(HISTORY_PAGE_SIZE + 1)
+        ])
+        r = self.client.get(reverse("payments_history"), secure=True)
+        r = self.client.get(reverse("payments_history"), {"before": r.context["next_before"]}, secure=True)
+        self.assertEqual([p.razorpay_order_id for p in r.context["payments"]], ["order_0"])
+
+
+def _payments(user, n, status="created"):
+    return Payment.objects.bulk_create([
+        Payment(user=user, credits=10, amount_paise=50000, razorpay_order_id=f"order_{user.pk}_{i}", status=status)
+        for i in range(n)
+    ], batch_size=5000)
+
+
+# budgets assume production's shared cache, where the user cache is on
+@override_settings(RAZORPAY_WEBHOOK_SECRET="whsec", AUTH_USER_CACHE_TTL=30)
+class AccountQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("budget@example.com", "pw", credits=5)
+        Label.objects.bulk_create([
+            Label(user=self.user, name="n", sku_type="t", category="c", unit_index=i, code=f"seed-{i}")
+            for i in range(100)
+        ])
+        _payments(self.user, 60)
+        self.client.force_login(self.user)
+        self.client.get(reverse("profile"), secure=True)  # warm the user cache
+
+    def test_profile_view(self):
+        # session + label count
+        with self.assertMaxQueries(2):
+            self.client.get(reverse("profile"), secure=True)
+
+    def test_payments_history(self):
+        # session + one page, however long the history
+        with self.assertMaxQueries(2):
+            r = self.client.get(reverse("payments_history"), secure=True)
+        with self.assertMaxQueries(2):
+            self.client.get(reverse("payments_history"), {"before": r.context["next_before"]}, secure=True)
+
+    @mock.patch("accounts.gateway.verify_payment_signature", return_value=True)
+    def test_payment_success(self, _verify):
+        data = {"razorpay_order_id": f"order_{self.user.pk}_0", "razorpay_payment_id": "pay_1",
+                "razorpay_signature": "sig"}
+        # session, locked payment read, payment + credit UPDATEs, rollup
+        # upsert, credits re-read, savepoints
+        with self.assertMaxQueries(11):
+            r = self.client.post(reverse("api_payment_success"), data, secure=True)
+        self.assertEqual(r.json()["credits_left"], 15)
+        with self.assertMaxQueries(5):  # a replay only re-reads credits
+            self.client.post(reverse("api_payment_success"), data, secure=True)
+
+    def test_webhook(self):
+        body = json.dumps({"event": "payment.captured", "payload": {"payment": {"entity": {
+            "order_id": f"order_{self.user.pk}_1", "id": "pay_2"}}}})
+        sig = hmac.new(b"whsec", body.encode(), hashlib.sha256).hexdigest()
+        # payment and user in one locked read, then the same writes as above
+        with self.assertMaxQueries(9):
+            r = self.client.post(reverse("razorpay_webhook"), body, content_type="application/json",
+                                 HTTP_X_RAZORPAY_SIGNATURE=sig, secure=True)
+        self.assertEqual(r.json()["msg"], "credited")
+
+
+@override_settings(ROOT_URLCONF=AsyncViewsURLConf, RAZORPAY_WEBHOOK_SECRET="whsec")
+class AsyncPaymentViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("async-pay@example.com", "pw", credits=5)
+        self.client.force_login(self.user)
+
+    @mock.patch("accounts.gateway.acreate_order", new_callable=mock.AsyncMock, return_value={"id": "order_async"})
+    def test_api_create_order_async(self, acreate_order):
+        r = self.client.post(reverse("api_create_order"), {"credits": "3"}, secure=True)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual((r.json()["order_id"], r.json()["amount"]), ("order_async", 3 * 50 * 100))
+        self.assertEqual(acreate_order.await_args.args[0]["notes"]["email"], self.user.email)
+        pay = Payment.objects.get(razorpay_order_id="order_async")
+        self.assertEqual((pay.user, pay.credits, pay.status), (self.user, 3, "created"))
+
+        self.assertEqual(self.client.post(reverse("api_create_order"), {"credits": "0"}, secure=True).status_code, 400)
+
+    @override_settings(RAZORPAY_KEY_ID="rzp_id", RAZORPAY_KEY_SECRET="rzp_secret")
+    def test_api_create_order_async_through_httpx(self):
+        # the real client code, against a transport standing in for Razorpay
+        sent = []
+
+        def razorpay(request):
+            sent.append(request)
+            return httpx.Response(200, json={"id": f"order_http_{len(sent)}"})
+
+        real_client = httpx.AsyncClient
+        clients = []
+
+        def client(**kw):
+            clients.append(real_client(transport=httpx.MockTransport(razorpay), **kw))
+            return clients[-1]
+
+        with mock.patch.object(httpx, "AsyncClient", client):
+            for _ in range(2):
+                r = self.client.post(reverse("api_create_order"), {"credits": "2"}, secure=True)
+                self.assertEqual(r.status_code, 200)
+        # each request ran on a fresh loop (async_to_sync), so each got its own client
+        self.assertEqual(len(clients), 2)
+        self.assertEqual([p.razorpay_order_id for p in Payment.objects.order_by("pk")], ["order_http_1", "order_http_2"])
+        self.assertEqual(str(sent[0].url), "https://api.razorpay.com/v1/orders")
+        self.assertEqual(sent[0].headers["authorization"], "Basic " + b64encode(b"rzp_id:rzp_secret").decode())
+        self.assertEqual(json.loads(sent[0].content)["amount"], 2 * 50 * 100)
+
+    def test_webhook_razorpay_async(self):
+        _payments(self.user, 1)
+        body = json.dumps({"event": "order.paid", "payload": {"order": {"entity": {"id": f"order_{self.user.pk}_0"}}}})
+        sig = hmac.new(b"whsec", body.encode(), hashlib.sha256).hexdigest()
+        post = lambda sig: self.client.post(reverse("razorpay_webhook"), body, content_type="application/json",
+                                            HTTP_X_RAZORPAY_SIGNATURE=sig, secure=True).json()
+        self.assertEqual(post("bad")["msg"], "invalid signature")
+        self.assertEqual(post(sig)["credits_left"], 15)
+        self.assertEqual(post(sig)["msg"], "already paid")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.credits, 15)
+
+
+@tag("perf")
+class AccountLatencyBudgetTests(QueryBudgetMixin, TestCase):
+    """Wall-clock budgets on a scaled dataset (`manage.py test --exclude-tag perf` skips them)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("scaled@example.com", "pw", credits=10)
+        Label.objects.bulk_create([
+            Label(user=cls.user, name=f"sku{i % 500}", sku_type="tee", category="men",
+                  unit_index=i, code=f"seed-{i:06d}")
+            for i in range(20_000)
+        ], batch_size=5000)
+        _payments(cls.user, 5_000, status="paid")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.client.get(reverse("profile"), secure=True)
+
+    def test_profile_view(self):
+        with self.assertWithinBudget(0.1):
+            self.client.get(reverse("profile"), secure=True)
+
+    def test_payments_history_deep_page(self):
+        before = Payment.objects.filter(user=self.user).order_by("id")[10].pk
+        with self.assertWithinBudget(0.1):
+            r = self.client.get(reverse("payments_history"), {"before": before}, secure=True)
+        self.assertEqual(len(r.context["payments"]), 10)
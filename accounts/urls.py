@@ -1,5 +1,5 @@
 # accounts/urls.py
-from django.urls import path
+from django.conf import settings
 from django.urls import path
 from .views import (
     profile_view,
@@ -9,15 +9,22 @@ from .views import (
     api_payment_success,     # <-- and this
     webhook_razorpay,
     payments_history,
+    usage_view,
+    api_create_order_async,
+    webhook_razorpay_async,
 )
 
+# ASGI deployments serve the native async variants
+_async = settings.ASYNC_VIEWS
+
 
 urlpatterns = [
     path("profile/", profile_view, name="profile"),
     path("signup/", signup_view, name="signup"),
     path("buy-credits/", buy_credits_view, name="buy_credits"),
-    path("api/create-order/", api_create_order, name="api_create_order"),
+    path("api/create-order/", api_create_order_async if _async else api_create_order, name="api_create_order"),
     path("api/payment-success/", api_payment_success, name="api_payment_success"),
-    path("api/webhook/razorpay/", webhook_razorpay, name="razorpay_webhook"),  # <-- new
+    path("api/webhook/razorpay/", webhook_razorpay_async if _async else webhook_razorpay, name="razorpay_webhook"),
     path("payments/", payments_history, name="payments_history"),
+    path("usage/", usage_view, name="usage"),
 ]
@@ -0,0 +1,83 @@
+# accounts/usage.py
+"""
+Daily usage rollups (UsageDaily). The write paths call record_usage()
+inside their own transaction, so a rollup never disagrees with the labels
+or payments it counts; rebuild() recomputes everything from scratch.
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from labels import archive
+from labels.models import Label
+from .models import Payment, UsageDaily
+
+
+def record_usage(user_id, labels=0, spent=Decimal("0"), purchased=Decimal("0")):
+    """Add to today's rollup row for `user_id`."""
+    day = timezone.localdate()
+    deltas = {
+        "labels_created": F("labels_created") + labels,
+        "credits_spent": F("credits_spent") + spent,
+        "credits_purchased": F("credits_purchased") + purchased,
+    }
+    if UsageDaily.objects.filter(user_id=user_id, day=day).update(**deltas):
+        return
+    try:
+        with transaction.atomic():
+            UsageDaily.objects.create(user_id=user_id, day=day, labels_created=labels,
+                                      credits_spent=spent, credits_purchased=purchased)
+    except IntegrityError:
+        # another request created today's row first
+        UsageDaily.objects.filter(user_id=user_id, day=day).update(**deltas)
+
+
+def _totals():
+    """(user_id, day) -> [labels, credits spent, credits purchased]"""
+    totals = defaultdict(lambda: [0, Decimal("0"), Decimal("0")])
+
+    hot = (Label.objects.annotate(day=TruncDate("created_at"))
+           .values("user_id", "day").annotate(n=Count("id"), spent=Sum("credits_charged")).order_by())
+    for row in hot:
+        t = totals[(row["user_id"], row["day"])]
+        t[0] += row["n"]
+        t[1] += row["spent"]
+    for row in archive.iter_rows():
+        t = totals[(row["user_id"], timezone.localdate(datetime.fromisoformat(row["created_at"])))]
+        t[0] += 1
+        t[1] += Decimal(row["credits_charged"])
+
+    paid = (Payment.objects.filter(status="paid")
+            .annotate(day=TruncDate(Coalesce("processed_at", "created_at")))
+            .values("user_id", "day").annotate(credits=Sum("credits")).order_by())
+    for row in paid:
+        totals[(row["user_id"], row["day"])][2] += Decimal(row["credits"])
+    return totals
+
+
+def rebuild():
+    """
+    Recompute every rollup from labels (hot + archived, each carrying what
+    it was charged) and paid payments. record_usage() is held off for the
+    duration, so an increment can't land between the totals being read and
+    the old rows being replaced.
+    """
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            # EXCLUSIVE still lets plain reads through
+            with connection.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {UsageDaily._meta.db_table} IN EXCLUSIVE MODE")
+        # on SQLite this DELETE takes the database write lock, to the same effect
+        UsageDaily.objects.all().delete()
+        totals = _totals()
+        UsageDaily.objects.bulk_create([
+            UsageDaily(user_id=user_id, day=day, labels_created=labels,
+                       credits_spent=spent, credits_purchased=purchased)
+            for (user_id, day), (labels, spent, purchased) in totals.items()
+        ], batch_size=1000)
+    return len(totals)
@@ -10,24 +10,34 @@ from django.contrib import messages
 from django.shortcuts import render, redirect
 from .forms import SignUpForm
 from labels.models import Label
-import razorpay
-from .models import Payment
+from asgiref.sync import sync_to_async
+from . import gateway
+from config.ratelimit import rate_limited
+from .backends import forget_cached_user
+from .models import Payment, UsageDaily, User
+from .usage import record_usage
 from django.db import transaction
+from django.db.models import F
 
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
+import datetime
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+HISTORY_PAGE_SIZE = 25
+
 def signup_view(request):
     if request.method == "POST":
         form = SignUpForm(request.POST)
         if form.is_valid():
             user = form.save()
             messages.success(request, "Your account was created. You’re now signed in.")
-            login(request, user)
+            # several backends are configured, so name the one that
+            # should own the new session
+            login(request, user, backend="accounts.backends.CachedModelBackend")
             return redirect("labels:home")
     else:
         form = SignUpForm()
@@ -52,57 +62,81 @@ def buy_credits_view(request):
         "current_credits": request.user.credits,
     })
 
-@login_required
-@require_POST
-def api_create_order(request):
+def _order_credits(post):
     # credits user wants to buy
     try:
-        credits = int(request.POST.get("credits", "0"))
+        credits = int(post.get("credits", "0"))
     except ValueError:
         credits = 0
-    if credits <= 0:
-        return HttpResponseBadRequest("Invalid credits")
+    return credits
 
+def _order_payload(user, credits):
     # pricing
-    amount_rupees = credits * settings.PRICE_PER_CREDIT
-    amount_paise = amount_rupees * 100
-    currency = settings.CURRENCY
-
-    # create order at Razorpay
-    client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-    r_order = client.order.create({
+    amount_paise = credits * settings.PRICE_PER_CREDIT * 100
+    return {
         "amount": amount_paise,
-        "currency": currency,
+        "currency": settings.CURRENCY,
         "payment_capture": 1,
         "notes": {
-            "user_id": str(request.user.public_id),
-            "email": request.user.email,
+            "user_id": str(user.public_id),
+            "email": user.email,
             "credits": str(credits),
         }
-    })
+    }
 
-    # persist our record
-    pay = Payment.objects.create(
-        user=request.user,
+def _payment_for_order(user, credits, payload, r_order):
+    return Payment(
+        user=user,
         credits=credits,
-        amount_paise=amount_paise,
-        currency=currency,
+        amount_paise=payload["amount"],
+        currency=payload["currency"],
         razorpay_order_id=r_order["id"],
         status="created",
     )
 
+def _order_response(user, pay):
     return JsonResponse({
-        "order_id": r_order["id"],
-        "amount": amount_paise,
-        "currency": currency,
-        "credits": credits,
+        "order_id": pay.razorpay_order_id,
+        "amount": pay.amount_paise,
+        "currency": pay.currency,
+        "credits": pay.credits,
         "key_id": settings.RAZORPAY_KEY_ID,
         "name": settings.SITE_NAME,
         "prefill": {
-            "email": request.user.email,
+            "email": user.email,
         }
     })
 
+@login_required
+@require_POST
+@rate_limited("orders")
+def api_create_order(request):
+    credits = _order_credits(request.POST)
+    if credits <= 0:
+        return HttpResponseBadRequest("Invalid credits")
+
+    # create order at Razorpay, then persist our record
+    payload = _order_payload(request.user, credits)
+    r_order = gateway.create_order(payload)
+    pay = _payment_for_order(request.user, credits, payload, r_order)
+    pay.save()
+    return _order_response(request.user, pay)
+
+@login_required
+@require_POST
+@rate_limited("orders")
+async def api_create_order_async(request):
+    credits = _order_credits(request.POST)
+    if credits <= 0:
+        return HttpResponseBadRequest("Invalid credits")
+
+    user = await request.auser()
+    payload = _order_payload(user, credits)
+    r_order = await gateway.acreate_order(payload)
+    pay = _payment_for_order(user, credits, payload, r_order)
+    await pay.asave()
+    return _order_response(user, pay)
+
 
 @login_required
 @require_POST
@@ -118,76 +152,45 @@ def api_payment_success(request):
     if not (order_id and payment_id and signature):
         return HttpResponseBadRequest("Missing params")
 
-    # find our payment record
-    try:
-        pay = Payment.objects.select_for_update().get(razorpay_order_id=order_id, user=request.user)
-    except Payment.DoesNotExist:
-        return HttpResponseBadRequest("Order not found")
-
-    # if already processed, just return current credits
-    if pay.status == "paid":
-        return JsonResponse({"ok": True, "credits_left": float(request.user.credits)})
-
-    # verify signature
-    client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-    try:
-        client.utility.verify_payment_signature({
-            "razorpay_order_id": order_id,
-            "razorpay_payment_id": payment_id,
-            "razorpay_signature": signature,
-        })
-    except razorpay.errors.SignatureVerificationError:
-        pay.status = "failed"
-        pay.razorpay_payment_id = payment_id
-        pay.razorpay_signature = signature
-        pay.processed_at = timezone.now()
-        pay.save(update_fields=["status", "razorpay_payment_id", "razorpay_signature", "processed_at"])
-        return JsonResponse({"ok": False, "error": "Signature verification failed"}, status=400)
-
-    # mark paid + credit the user (atomic via select_for_update above)
-    from django.db import transaction
+    # find our payment record; the row lock only holds inside a transaction,
+    # which also keeps every read here on the primary database
     with transaction.atomic():
+        try:
+            pay = Payment.objects.select_for_update().get(razorpay_order_id=order_id, user=request.user)
+        except Payment.DoesNotExist:
+            return HttpResponseBadRequest("Order not found")
+
+        # if already processed, just return current credits
+        if pay.status == "paid":
+            request.user.refresh_from_db(fields=["credits"])
+            return JsonResponse({"ok": True, "credits_left": float(request.user.credits)})
+
+        # verify signature
+        if not gateway.verify_payment_signature(order_id, payment_id, signature):
+            pay.status = "failed"
+            pay.razorpay_payment_id = payment_id
+            pay.razorpay_signature = signature
+            pay.processed_at = timezone.now()
+            pay.save(update_fields=["status", "razorpay_payment_id", "razorpay_signature", "processed_at"])
+            return JsonResponse({"ok": False, "error": "Signature verification failed"}, status=400)
+
+        # mark paid + credit the user (atomic via select_for_update above)
         pay.status = "paid"
         pay.razorpay_payment_id = payment_id
         pay.razorpay_signature = signature
         pay.processed_at = timezone.now()
         pay.save(update_fields=["status", "razorpay_payment_id", "razorpay_signature", "processed_at"])
 
-        # add credits (integers)
-        request.user.credits = (request.user.credits or Decimal("0")) + Decimal(pay.credits)
-        request.user.save(update_fields=["credits"])
+        # add credits (integers) relative to the primary's value, not request.user's
+        User.objects.filter(pk=request.user.pk).update(credits=F("credits") + pay.credits)
+        record_usage(request.user.pk, purchased=Decimal(pay.credits))
+        request.user.refresh_from_db(fields=["credits"])
+        transaction.on_commit(lambda: forget_cached_user(request.user.pk))
 
     return JsonResponse({"ok": True, "credits_left": float(request.user.credits)})
 
 
-@csrf_exempt
-@require_POST
-def webhook_razorpay(request):
-    import razorpay
-
-    secret = settings.RAZORPAY_WEBHOOK_SECRET or ""
-    sig = request.headers.get("X-Razorpay-Signature", "")
-
-    # --- body bytes -> string once ---
-    body_bytes = request.body
-    body_str = body_bytes.decode("utf-8")
-
-    # 1) Verify signature (use client.utility)
-    try:
-        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-        client.utility.verify_webhook_signature(body_str, sig, secret)
-    except Exception as e:
-        logger.error("Webhook: signature verify failed: %s", e)
-        # During dev, return 200 so Razorpay doesn't retry forever
-        return JsonResponse({"ok": False, "msg": "invalid signature"}, status=200)
-
-    # 2) Parse JSON (use body_str, not 'body')
-    try:
-        payload = json.loads(body_str)
-    except Exception:
-        logger.error("Webhook: bad JSON")
-        return JsonResponse({"ok": False, "msg": "bad json"}, status=200)
-
+def _webhook_order(payload):
     event = payload.get("event")
     payment_entity = (payload.get("payload", {}).get("payment", {}) or {}).get("entity") or {}
     order_id = payment_entity.get("order_id")
@@ -195,17 +198,17 @@ def webhook_razorpay(request):
     if not order_id:
         order_entity = (payload.get("payload", {}).get("order", {}) or {}).get("entity") or {}
         order_id = order_entity.get("id")
+    return event, order_id, payment_id
 
-    if not order_id:
-        logger.warning("Webhook: no order_id in payload")
-        return JsonResponse({"ok": True, "msg": "no order id"}, status=200)
-
-    # 3) Idempotent credit
+def _apply_webhook(event, order_id, payment_id):
+    """Idempotently credit the order's user; returns the JSON reply."""
     try:
         with transaction.atomic():
-            pay = Payment.objects.select_for_update().get(razorpay_order_id=order_id)
+            # the join also locks the user row, so the credit write below
+            # can't race a concurrent api_create
+            pay = Payment.objects.select_for_update().select_related("user").get(razorpay_order_id=order_id)
             if pay.status == "paid":
-                return JsonResponse({"ok": True, "msg": "already paid"}, status=200)
+                return {"ok": True, "msg": "already paid"}
 
             if event in ("order.paid", "payment.captured", "payment.authorized"):
                 pay.status = "paid"
@@ -217,19 +220,97 @@ def webhook_razorpay(request):
                 user = pay.user
                 user.credits = (user.credits or Decimal("0")) + Decimal(pay.credits)
                 user.save(update_fields=["credits"])
+                record_usage(user.pk, purchased=Decimal(pay.credits))
 
                 logger.info("Webhook: credited %s credits to %s", pay.credits, user.email)
-                return JsonResponse({"ok": True, "msg": "credited", "credits_left": float(user.credits)}, status=200)
+                return {"ok": True, "msg": "credited", "credits_left": float(user.credits)}
             else:
                 logger.info("Webhook: ignored event %s", event)
-                return JsonResponse({"ok": True, "msg": f"ignored {event}"}, status=200)
+                return {"ok": True, "msg": f"ignored {event}"}
     except Payment.DoesNotExist:
         logger.warning("Webhook: payment not found for order %s", order_id)
-        return JsonResponse({"ok": True, "msg": "payment not found"}, status=200)
+        return {"ok": True, "msg": "payment not found"}
+
+def _webhook_preamble(request):
+    """
+    Verify + parse the webhook body. Returns (reply, None) to answer early,
+    or (None, (event, order_id, payment_id)) to go on and apply it.
+    """
+    secret = settings.RAZORPAY_WEBHOOK_SECRET or ""
+    sig = request.headers.get("X-Razorpay-Signature", "")
+
+    # --- body bytes -> string once ---
+    body_str = request.body.decode("utf-8")
+
+    # 1) Verify signature
+    if not gateway.verify_webhook_signature(body_str, sig, secret):
+        logger.error("Webhook: signature verify failed")
+        # During dev, return 200 so Razorpay doesn't retry forever
+        return {"ok": False, "msg": "invalid signature"}, None
+
+    # 2) Parse JSON
+    try:
+        payload = json.loads(body_str)
+    except Exception:
+        logger.error("Webhook: bad JSON")
+        return {"ok": False, "msg": "bad json"}, None
+
+    event, order_id, payment_id = _webhook_order(payload)
+    if not order_id:
+        logger.warning("Webhook: no order_id in payload")
+        return {"ok": True, "msg": "no order id"}, None
+    return None, (event, order_id, payment_id)
+
+@csrf_exempt
+@require_POST
+def webhook_razorpay(request):
+    reply, args = _webhook_preamble(request)
+    if reply is None:
+        # 3) Idempotent credit
+        reply = _apply_webhook(*args)
+    return JsonResponse(reply, status=200)
+
+@csrf_exempt
+@require_POST
+async def webhook_razorpay_async(request):
+    reply, args = _webhook_preamble(request)
+    if reply is None:
+        reply = await sync_to_async(_apply_webhook)(*args)
+    return JsonResponse(reply, status=200)
 
 @login_required
 def payments_history(request):
-    payments = (Payment.objects
-                .filter(user=request.user)
-                .order_by("-created_at"))
-    return render(request, "accounts/payments.html", {"payments": payments})
+    # keyset pagination: ?before=<id> instead of OFFSET, so every page costs
+    # the same however long the history is
+    payments, next_before = _keyset_page(
+        Payment.objects.filter(user=request.user), "id", request.GET.get("before"), int)
+    return render(request, "accounts/payments.html", {
+        "payments": payments,
+        "next_before": next_before,
+    })
+
+@login_required
+def usage_view(request):
+    days, next_before = _keyset_page(
+        UsageDaily.objects.filter(user=request.user), "day", request.GET.get("before"),
+        datetime.date.fromisoformat)
+    return render(request, "accounts/usage.html", {
+        "days": days,
+        "next_before": next_before,
+    })
+
+def _keyset_page(qs, key, before, parse):
+    """
+    Newest-first page of `qs` ordered by `key`, starting below `before`.
+    Returns (rows, cursor for the next page or None).
+    """
+    if before:
+        try:
+            qs = qs.filter(**{f"{key}__lt": parse(before)})
+        except ValueError:
+            pass
+    rows = list(qs.order_by(f"-{key}")[:HISTORY_PAGE_SIZE + 1])
+    if len(rows) > HISTORY_PAGE_SIZE:
+        rows = rows[:HISTORY_PAGE_SIZE]
+        return rows, getattr(rows[-1], key)
+    return rows, None
@@ -0,0 +1,126 @@
+"""
+Label changelist render time on a large table.
+
+    python benchmarks/admin_changelist.py --rows 5000000 [--db /path/big.sqlite3]
+
+Seeds --rows labels across --users accounts (once; pass --db to reuse the
+file between runs), then renders a few changelist pages as a superuser with
+the stock ModelAdmin options and with the current LabelAdmin. Point
+DATABASE_URL at PostgreSQL instead of --db to measure there.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+PAGES = [
+    ("unfiltered", ""),
+    ("user filter", "?user={user_id}"),
+    ("code search", "?q={prefix}"),
+    ("sku_type filter", "?sku_type=tee"),
+]
+
+
+def _setup(db_path):
+    sys.path.insert(0, str(BASE_DIR))
+    if db_path:
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+
+
+def _seed(rows, users, batch=20_000):
+    from django.db import connection, transaction
+    from accounts.models import User
+    from labels.models import Label
+
+    if Label.objects.exists():
+        return
+    owners = [User.objects.create_user(f"bench{i}@example.com", "x") for i in range(users)]
+    table = Label._meta.db_table
+    sql = (f"INSERT INTO {table} (user_id, name, sku_type, category, unit_index, code, created_at, credits_charged) "
+           f"VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, 0.1)")
+    t0 = time.perf_counter()
+    for start in range(0, rows, batch):
+        params = []
+        for n in range(start, min(rows, start + batch)):
+            u = owners[n % users]
+            params.append((u.pk, f"sku{n // 100}", ("tee", "dress", "kurta")[n % 3],
+                           f"cat{n % 7}", n, f"{str(u.public_id)[:8]}-sku{n}-{n:09d}"))
+        with transaction.atomic(), connection.cursor() as cur:
+            cur.executemany(sql, params)
+    print(f"seeded {rows} labels in {time.perf_counter() - t0:.1f}s")
+
+
+def _render(client, pages, repeat):
+    out = []
+    for label, url in pages:
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            r = client.get(f"/admin/labels/label/{url}", secure=True)
+            best = min(best, time.perf_counter() - t0)
+            assert r.status_code == 200, r.status_code
+        out.append((label, best))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5_000_000)
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--db")
+    a = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = a.db or (None if os.getenv("DATABASE_URL") else str(Path(tmp) / "bench.sqlite3"))
+        _setup(db)
+        _seed(a.rows, a.users)
+
+        from django.contrib import admin as dj_admin
+        from django.test import Client
+        from django.test.utils import override_settings, setup_test_environment
+        from accounts.models import User
+        from labels.admin import LabelAdmin
+
+        setup_test_environment()
+        # the manifest storage needs collectstatic; plain storage is enough here
+        override_settings(STORAGES={
+            "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+        }).enable()
+        admin_user = User.objects.filter(is_superuser=True).first() or \
+            User.objects.create_superuser("admin@example.com", "x")
+        owner = User.objects.filter(labels__isnull=False).first()
+        client = Client()
+        client.force_login(admin_user)
+        pages = [(label, url.format(user_id=owner.pk, prefix=str(owner.public_id)[:8] + "-sku1"))
+                 for label, url in PAGES]
+
+        stock = dict(
+            list_filter=("sku_type", "category", "user"),
+            list_select_related=False,
+            search_fields=("code", "name"),
+            paginator=dj_admin.ModelAdmin.paginator,
+            show_full_result_count=True,
+            get_search_results=dj_admin.ModelAdmin.get_search_results,
+        )
+        with mock.patch.multiple(LabelAdmin, **stock):
+            before = _render(client, [(l, u.replace("?user=", "?user__id__exact=")) for l, u in pages], a.repeat)
+        after = _render(client, pages, a.repeat)
+
+    print(f"changelist render, best of {a.repeat}:")
+    for (label, b), (_, t) in zip(before, after):
+        print(f"  {label:16s} stock {b * 1000:9.1f}ms   tuned {t * 1000:9.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Concurrent create-order capacity of one process under gateway latency.
+
+    python benchmarks/asgi_gateway_latency.py --latency 0.3 --concurrency 50
+
+The Razorpay call is replaced by a sleep of --latency seconds. The sync view
+is driven the way a sync gunicorn worker drives it (one request at a time);
+the async view gets --concurrency requests at once on a single event loop.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from unittest import mock
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def _setup(db_path):
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    # every request here is the same user; the orders bucket would cut the
+    # run off after its burst
+    os.environ["RATE_LIMIT_ENABLED"] = "0"
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--latency", type=float, default=0.3)
+    ap.add_argument("--concurrency", type=int, default=50)
+    a = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _setup(Path(tmp) / "bench.sqlite3")
+        from django.test import AsyncRequestFactory, RequestFactory
+        from accounts import gateway
+        from accounts.models import User
+        from accounts.views import api_create_order, api_create_order_async
+
+        user = User.objects.create_user("bench@example.com", "x")
+
+        def slow_order(payload):
+            time.sleep(a.latency)
+            return {"id": f"order_{uuid.uuid4().hex[:14]}"}
+
+        async def aslow_order(payload):
+            await asyncio.sleep(a.latency)
+            return {"id": f"order_{uuid.uuid4().hex[:14]}"}
+
+        # sync worker: requests are served back to back
+        rf = RequestFactory()
+        with mock.patch.object(gateway, "create_order", slow_order):
+            t0 = time.perf_counter()
+            for _ in range(a.concurrency):
+                req = rf.post("/accounts/api/create-order/", {"credits": "1"})
+                req.user = user
+                assert api_create_order(req).status_code == 200
+            sync_wall = time.perf_counter() - t0
+
+        # async worker: all requests in flight on one loop
+        arf = AsyncRequestFactory()
+
+        async def one():
+            req = arf.post("/accounts/api/create-order/", {"credits": "1"})
+
+            async def auser():
+                return user
+            req.auser = auser
+            resp = await api_create_order_async(req)
+            assert resp.status_code == 200
+
+        async def burst():
+            await asyncio.gather(*(one() for _ in range(a.concurrency)))
+
+        with mock.patch.object(gateway, "acreate_order", aslow_order):
+            t0 = time.perf_counter()
+            asyncio.run(burst())
+            async_wall = time.perf_counter() - t0
+
+    n = a.concurrency
+    print(f"{n} create-order requests, {a.latency * 1000:.0f}ms simulated gateway latency")
+    print(f"  sync  worker: {sync_wall:6.2f}s  {n / sync_wall:7.1f} req/s")
+    print(f"  async worker: {async_wall:6.2f}s  {n / async_wall:7.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Tail latency of a well-behaved account while another one floods api_create.
+
+    python benchmarks/ratelimit_tail_latency.py --noisy 4 --units 2000 --seconds 10
+
+--noisy processes post --units-label creates back to back for one account
+(ignoring 429s, like a runaway script); a quiet process creates one label
+every 50ms for a second account and records its latency. Runs once with
+RATE_LIMIT_ENABLED=0 and once with it on, sharing a file-based cache so the
+limits apply across processes, on a tuned SQLite file.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def _setup():
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+    django.setup()
+
+
+def _post(rf, view, user, units, category):
+    req = rf.post("/api/create/", {"name": "bench", "units": str(units), "type": "t", "category": category})
+    req.user = user
+    return view(req)
+
+
+def _noisy(args):
+    user_id, units, deadline = args
+    _setup()
+    from django.db import OperationalError
+    from django.test import RequestFactory
+    from accounts.models import User
+    from labels.views import api_create
+
+    rf, user, sent, admitted = RequestFactory(), User.objects.get(pk=user_id), 0, 0
+    while time.time() < deadline:
+        try:
+            admitted += _post(rf, api_create, user, units, f"n{os.getpid()}-{sent}").status_code == 200
+        except OperationalError:
+            pass
+        sent += 1
+    return sent, admitted
+
+
+def _quiet(args):
+    user_id, deadline = args
+    _setup()
+    from django.test import RequestFactory
+    from accounts.models import User
+    from labels.views import api_create
+
+    rf, user, lat = RequestFactory(), User.objects.get(pk=user_id), []
+    time.sleep(0.5)  # let the flood build up
+    while time.time() < deadline:
+        t0 = time.perf_counter()
+        resp = _post(rf, api_create, user, 1, f"q{len(lat)}")
+        lat.append((time.perf_counter() - t0, resp.status_code))
+        time.sleep(0.05)
+    return lat
+
+
+def run_phase(noisy, units, seconds):
+    _setup()
+    from django.core.management import call_command
+    from django.db import connections
+    from accounts.models import User
+
+    call_command("migrate", verbosity=0)
+    flood = User.objects.create_user("flood@example.com", "x", credits=10**7).pk
+    quiet = User.objects.create_user("quiet@example.com", "x", credits=10**7).pk
+    connections.close_all()
+
+    deadline = time.time() + seconds
+    with mp.get_context("fork").Pool(noisy + 1) as pool:
+        q = pool.apply_async(_quiet, [(quiet, deadline)])
+        flooders = pool.map(_noisy, [(flood, units, deadline)] * noisy)
+        lat = q.get()
+
+    ok = sorted(t for t, status in lat if status == 200)
+    p = lambda q: ok[min(len(ok) - 1, int(q * len(ok)))] * 1000 if ok else float("nan")
+    sent = sum(s for s, _ in flooders)
+    admitted = sum(a for _, a in flooders)
+    print(f"  flood: {admitted}/{sent} admitted   "
+          f"quiet: {len(ok)}/{len(lat)} ok  p50 {p(0.5):.1f}ms  p99 {p(0.99):.1f}ms  max {p(1):.1f}ms")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--noisy", type=int, default=4)
+    ap.add_argument("--units", type=int, default=2000)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--phase")
+    a = ap.parse_args()
+
+    if a.phase:
+        run_phase(a.noisy, a.units, a.seconds)
+        return
+
+    for phase, enabled in (("no limiter", "0"), ("limiter", "1")):
+        print(f"{phase}:")
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                RATE_LIMIT_ENABLED=enabled,
+                DATABASE_URL=f"sqlite:///{Path(tmp) / 'bench.sqlite3'}",
+                DJANGO_SQLITE_TUNING="1",
+                DJANGO_CACHE_BACKEND="django.core.cache.backends.filebased.FileBasedCache",
+                DJANGO_CACHE_LOCATION=str(Path(tmp) / "cache"),
+            )
+            subprocess.run([
+                sys.executable, __file__, "--phase", phase, "--noisy", str(a.noisy),
+                "--units", str(a.units), "--seconds", str(a.seconds),
+            ], env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Multi-process write contention on the SQLite fallback database.
+
+    python benchmarks/sqlite_contention.py --workers 8 --requests 40 --units 10
+
+Runs the same api_create load twice against a fresh db file: once with the
+stock settings and once with DJANGO_SQLITE_TUNING=1. Every worker process
+hammers the view for its own user; we report throughput, latency and how
+many calls died with "database is locked". Any other failure (402/409
+responses, other errors) is listed separately. Rate limiting is off, so
+the numbers measure the database rather than the token buckets.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def _setup(db_path):
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["RATE_LIMIT_ENABLED"] = "0"
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+    django.setup()
+
+
+def _worker(args):
+    db_path, user_id, n_requests, units = args
+    _setup(db_path)
+    from django.db import OperationalError
+    from django.test import RequestFactory
+    from accounts.models import User
+    from labels.views import api_create
+
+    rf = RequestFactory()
+    latencies, locked, other = [], 0, Counter()
+    for i in range(n_requests):
+        req = rf.post("/api/create/", {
+            "name": f"bench-{user_id}", "units": str(units),
+            "type": "tee", "category": f"c{i}",
+        })
+        t0 = time.perf_counter()
+        try:
+            req.user = User.objects.get(pk=user_id)
+            resp = api_create(req)
+            if resp.status_code != 200:
+                other[f"HTTP {resp.status_code}"] += 1
+        except OperationalError as e:
+            if "database is locked" in str(e):
+                locked += 1
+            else:
+                other[f"OperationalError: {e}"] += 1
+        except Exception as e:
+            other[type(e).__name__] += 1
+        latencies.append(time.perf_counter() - t0)
+    return latencies, locked, other
+
+
+def run_phase(db_path, workers, n_requests, units):
+    _setup(db_path)
+    from django.core.management import call_command
+    from django.db import connections
+    from accounts.models import User
+
+    call_command("migrate", verbosity=0)
+    ids = [User.objects.create_user(f"bench{i}@example.com", "x", credits=10**6).pk
+           for i in range(workers)]
+    connections.close_all()
+
+    t0 = time.perf_counter()
+    with mp.get_context("fork").Pool(workers) as pool:
+        results = pool.map(_worker, [(db_path, uid, n_requests, units) for uid in ids])
+    wall = time.perf_counter() - t0
+
+    lat = sorted(x for r in results for x in r[0])
+    locked = sum(r[1] for r in results)
+    other = sum((r[2] for r in results), Counter())
+    total = len(lat)
+    ok = total - locked - sum(other.values())
+    p = lambda q: lat[min(total - 1, int(q * total))] * 1000
+    print(f"  ok {ok}/{total}  locked {locked}  "
+          f"{ok / wall:.1f} req/s  "
+          f"p50 {p(0.50):.1f}ms  p99 {p(0.99):.1f}ms")
+    for what, n in other.most_common():
+        print(f"  other failures: {n} x {what}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=40)
+    ap.add_argument("--units", type=int, default=10)
+    ap.add_argument("--phase", choices=["plain", "tuned"])
+    ap.add_argument("--db")
+    a = ap.parse_args()
+
+    if a.phase:
+        run_phase(a.db, a.workers, a.requests, a.units)
+        return
+
+    for phase in ("plain", "tuned"):
+        print(f"{phase}:")
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DJANGO_SQLITE_TUNING="1" if phase == "tuned" else "0")
+            subprocess.run([
+                sys.executable, __file__, "--phase", phase, "--db", str(Path(tmp) / "bench.sqlite3"),
+                "--workers", str(a.workers), "--requests", str(a.requests), "--units", str(a.units),
+            ], env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
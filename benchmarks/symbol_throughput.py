@@ -0,0 +1,65 @@
+"""
+2D symbol encoding throughput.
+
+    python benchmarks/symbol_throughput.py --count 10000
+
+Encodes --count label payloads (code + SKU fields, as api_symbols sends
+them) as QR and Data Matrix, once as a single batch and once a symbol at a
+time (batches of one, i.e. no cross-symbol Reed–Solomon or placement
+batching), then renders the batch to SVG and PNG.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from labels import symbols  # noqa: E402
+
+
+def payloads(count, seed=7):
+    rng = random.Random(seed)
+    out = []
+    for i in range(count):
+        name = rng.choice(["riwaaz", "chikankari-ankita", "basic-tee", "linen-kurta-long"])
+        sku_type = rng.choice(["dress", "kurta", "tee"])
+        category = rng.choice(["womens", "mens", "kids"])
+        out.append(f"9a44d71b-{name}-{sku_type}-{category}-{i:05d}\n{name}\n{sku_type}\n{category}\n{i}")
+    return out
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--count", type=int, default=10_000)
+    a = ap.parse_args()
+
+    data = payloads(a.count)
+    symbols.encode_batch("qr", data[:10])  # build the cached tables/layouts first
+    symbols.encode_batch("datamatrix", data[:10])
+
+    print(f"{a.count} symbols, payload {min(map(len, data))}-{max(map(len, data))} bytes")
+    for fmt in symbols.FORMATS:
+        matrices, batch = timed(lambda: symbols.encode_batch(fmt, data))
+        _, single = timed(lambda: [symbols.encode_batch(fmt, [p])[0] for p in data])
+        quiet = symbols.quiet_zone(fmt)
+        _, svg = timed(lambda: [symbols.to_svg(m, quiet) for m in matrices])
+        _, png = timed(lambda: [symbols.to_png(m, quiet, 4) for m in matrices])
+        sizes = sorted({m.shape[0] for m in matrices})
+        print(f"  {fmt:10s} {sizes} modules")
+        print(f"    encode, one batch   {batch:6.2f}s  {a.count / batch:8.0f}/s")
+        print(f"    encode, one by one  {single:6.2f}s  {a.count / single:8.0f}/s")
+        print(f"    svg                 {svg:6.2f}s  {a.count / svg:8.0f}/s")
+        print(f"    png (4px/module)    {png:6.2f}s  {a.count / png:8.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
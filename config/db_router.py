@@ -0,0 +1,98 @@
+# config/db_router.py
+"""
+Primary/replica routing.
+
+Reads go round-robin to the DATABASE_REPLICAS aliases, writes (and anything
+inside a transaction on the primary) go to "default". After a request
+writes, the client gets a short-lived pin cookie so its next few requests
+read from the primary and never see their own changes missing.
+"""
+import itertools
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = "db_pin"
+
+# per-request state: "pinned" (read primary) / "wrote" (set the pin cookie)
+_pinned = ContextVar("db_pinned", default=False)
+_wrote = ContextVar("db_wrote", default=False)
+
+_next_read = itertools.count()  # round-robin position over DATABASE_REPLICAS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or _pinned.get():
+            return DEFAULT_DB_ALIAS
+        # reads inside a write transaction must see that transaction
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = settings.DATABASE_REPLICAS
+        return replicas[next(_next_read) % len(replicas)]
+
+    def db_for_write(self, model, **hints):
+        _pinned.set(True)
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+
+class ReplicaPinMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens = self._start(request)
+        try:
+            return self._finish(self.get_response(request))
+        finally:
+            self._reset(tokens)
+
+    async def __acall__(self, request):
+        tokens = self._start(request)
+        try:
+            return self._finish(await self.get_response(request))
+        finally:
+            self._reset(tokens)
+
+    def _start(self, request):
+        return _pinned.set(PIN_COOKIE in request.COOKIES), _wrote.set(False)
+
+    def _finish(self, response):
+        if _wrote.get() and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE, "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True, samesite="Lax",
+            )
+        return response
+
+    def _reset(self, tokens):
+        _pinned.reset(tokens[0])
+        _wrote.reset(tokens[1])
+
+
+def _clear_pin(**kwargs):
+    # the middleware restores the values it found, which a write made outside
+    # any request (management command, test setup) may have left set
+    _pinned.set(False)
+    _wrote.set(False)
+
+
+request_finished.connect(_clear_pin, dispatch_uid="db_router_clear_pin")
@@ -0,0 +1,35 @@
+# config/gunicorn.py
+"""
+WSGI deployment profile (used by the Procfile):
+
+    gunicorn -c config/gunicorn.py config.wsgi:application
+
+The app is imported once in the master and workers are forked from it, so
+Django setup, the URLconf and the view modules are shared copy-on-write
+instead of being re-imported by every worker. `manage.py startup_profile`
+shows where that import time goes.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
+
+
+def when_ready(server):
+    # runs in the master after the app is loaded, before any worker forks:
+    # import everything the first request would otherwise pull in
+    from django.urls import get_resolver
+    from accounts import gateway
+
+    get_resolver().url_patterns
+    gateway.preload()
+
+
+def pre_fork(server, worker):
+    # nothing should have connected yet, but a socket inherited across fork
+    # would be shared between workers
+    from django.db import connections
+
+    connections.close_all()
@@ -0,0 +1,26 @@
+# config/gunicorn_asgi.py
+"""
+ASGI deployment profile:
+
+    gunicorn -c config/gunicorn_asgi.py config.asgi:application
+
+Uvicorn workers run the async label/payment views, so requests waiting on
+Razorpay don't occupy a worker the way sync gunicorn workers do. Binding,
+worker count, the preloaded master and its hooks come from
+config/gunicorn.py, so the two profiles can't drift apart.
+"""
+import os
+import runpy
+
+# gunicorn execs this file before the project is on sys.path, so load the
+# WSGI profile by path rather than importing config.gunicorn
+_wsgi = runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn.py"))
+
+bind = _wsgi["bind"]
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = _wsgi["workers"]
+# Django doesn't support persistent connections under ASGI
+raw_env = ["DJANGO_ASYNC_VIEWS=1", "DJANGO_CONN_MAX_AGE=0"]
+preload_app = _wsgi["preload_app"]
+when_ready = _wsgi["when_ready"]
+pre_fork = _wsgi["pre_fork"]
@@ -0,0 +1,208 @@
+# config/ratelimit.py
+"""
+Admission control for the expensive write endpoints.
+
+- Token bucket per (bucket, user) kept in the cache, refilled at `rate`
+  tokens/s up to `burst`. A request costs its weight (labels requested for
+  api_create, 1 for an order). Empty bucket -> 429 with Retry-After.
+  Tokens are given back when the view doesn't answer 2xx (bad payload,
+  not enough credits, ...), so only work actually done is charged.
+- A global cap on in-flight bulk creates, as N cache "slots" taken with
+  cache.add(); a slot left behind by a crashed worker expires on its own.
+
+Both live in the cache, so with a shared cache (redis/memcached) the limits
+hold across workers. A bucket's read-modify-write runs under a short lock
+taken with cache.add(), so concurrent requests from one user can't all
+spend the same tokens.
+"""
+import logging
+import math
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponseBadRequest, JsonResponse
+
+logger = logging.getLogger(__name__)
+
+SLOT_TIMEOUT = 120  # seconds a bulk-create slot can be held before it expires
+LOCK_TIMEOUT = 2    # seconds a bucket lock can be held before it expires
+LOCK_WAIT = 0.5     # seconds to wait for a bucket lock before giving up
+
+
+class BucketBusy(Exception):
+    pass
+
+
+@contextmanager
+def _locked(key):
+    """Hold `key`'s lock for one read-modify-write of the bucket."""
+    lock = f"{key}:lock"
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(lock, 1, timeout=LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            raise BucketBusy(key)
+        time.sleep(0.002)
+    try:
+        yield
+    finally:
+        cache.delete(lock)
+
+
+def _refilled(key, rate, burst, now):
+    tokens, ts = cache.get(key, (burst, now))
+    return min(burst, tokens + (now - ts) * rate)
+
+
+def _bucket(bucket, user_id):
+    rate, burst = settings.RATE_LIMITS[bucket]
+    return f"rl:{bucket}:{user_id}", rate, burst
+
+
+def take_tokens(bucket, user_id, cost):
+    """
+    Try to spend `cost` tokens. Returns (allowed, remaining, retry_after).
+    """
+    key, rate, burst = _bucket(bucket, user_id)
+    try:
+        with _locked(key):
+            now = time.time()
+            tokens = _refilled(key, rate, burst, now)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            cache.set(key, (tokens, now), timeout=math.ceil(burst / rate) + 1)
+    except BucketBusy:
+        # this user has requests queued up on the lock already
+        return False, 0, 1
+    retry_after = 0 if allowed else math.ceil((cost - tokens) / rate)
+    return allowed, int(tokens), retry_after
+
+
+def refund_tokens(bucket, user_id, cost):
+    """Give back `cost` tokens taken by take_tokens(). Returns the remaining count."""
+    key, rate, burst = _bucket(bucket, user_id)
+    try:
+        with _locked(key):
+            now = time.time()
+            tokens = min(burst, _refilled(key, rate, burst, now) + cost)
+            cache.set(key, (tokens, now), timeout=math.ceil(burst / rate) + 1)
+    except BucketBusy:
+        logger.warning("Rate limit: refund of %s to %s dropped, bucket busy", cost, key)
+        return 0
+    return int(tokens)
+
+
+def acquire_slot(name, limit):
+    for i in range(limit):
+        key = f"slot:{name}:{i}"
+        if cache.add(key, 1, timeout=SLOT_TIMEOUT):
+            return key
+    return None
+
+
+def release_slot(key):
+    cache.delete(key)
+
+
+def _rejected(message, retry_after, headers):
+    resp = JsonResponse({"error": message}, status=429)
+    resp["Retry-After"] = str(max(1, retry_after))
+    for k, v in headers.items():
+        resp[k] = v
+    return resp
+
+
+def _admit(bucket, user_id, cost, bulk):
+    """
+    Returns (rejection, headers, slot): a 429/400 response to send instead
+    of calling the view (or None), the rate-limit headers, and the bulk
+    slot to release once the view is done (or None).
+    """
+    rate, burst = settings.RATE_LIMITS[bucket]
+    if cost > burst:
+        return HttpResponseBadRequest(f"At most {burst} per request"), {}, None
+
+    # the slot first, so a request turned away for lack of one costs no tokens
+    slot = None
+    if bulk:
+        slot = acquire_slot(bucket, settings.BULK_CREATE_MAX_IN_FLIGHT)
+        if slot is None:
+            headers = {"X-RateLimit-Limit": str(burst)}
+            return _rejected("Too many bulk requests in progress.", 1, headers), headers, None
+
+    allowed, remaining, retry_after = take_tokens(bucket, user_id, cost)
+    headers = {"X-RateLimit-Limit": str(burst), "X-RateLimit-Remaining": str(remaining)}
+    if not allowed:
+        if slot:
+            release_slot(slot)
+        return _rejected("Rate limit exceeded. Please slow down.", retry_after, headers), headers, None
+    return None, headers, slot
+
+
+def rate_limited(bucket, cost=lambda request: 1):
+    """
+    Decorate a (login_required) view with the `bucket` token bucket. `cost`
+    maps the request to its weight; requests weighing BULK_CREATE_MIN_UNITS
+    or more also need one of the global bulk slots.
+    """
+    def decorator(view):
+        def prepare(request, user_id):
+            """(rejection, headers, slot, tokens charged)"""
+            if not settings.RATE_LIMIT_ENABLED:
+                return None, {}, None, 0
+            weight = cost(request)
+            rejection, headers, slot = _admit(bucket, user_id, weight, weight >= settings.BULK_CREATE_MIN_UNITS)
+            return rejection, headers, slot, 0 if rejection is not None else weight
+
+        def settle(response, user_id, headers, charged):
+            # a request the view turned down costs nothing
+            if charged and not 200 <= response.status_code < 300:
+                headers["X-RateLimit-Remaining"] = str(refund_tokens(bucket, user_id, charged))
+            for k, v in headers.items():
+                response[k] = v
+            return response
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def _wrapped(request, *args, **kwargs):
+                user = await request.auser()
+                rejection, headers, slot, charged = await sync_to_async(prepare)(request, user.pk)
+                if rejection is not None:
+                    return rejection
+                response = None
+                try:
+                    response = await view(request, *args, **kwargs)
+                finally:
+                    if response is None and charged:  # the view raised
+                        await sync_to_async(refund_tokens)(bucket, user.pk, charged)
+                    if slot:
+                        await sync_to_async(release_slot)(slot)
+                return await sync_to_async(settle)(response, user.pk, headers, charged)
+        else:
+            @wraps(view)
+            def _wrapped(request, *args, **kwargs):
+                rejection, headers, slot, charged = prepare(request, request.user.pk)
+                if rejection is not None:
+                    return rejection
+                response = None
+                try:
+                    response = view(request, *args, **kwargs)
+                finally:
+                    if response is None and charged:  # the view raised
+                        refund_tokens(bucket, request.user.pk, charged)
+                    if slot:
+                        release_slot(slot)
+                return settle(response, request.user.pk, headers, charged)
+        return _wrapped
+    return decorator
+
+
+def units_cost(request):
+    try:
+        return max(1, int(request.POST.get("units", "0") or 0))
+    except ValueError:
+        return 1  # let the view reject the payload
@@ -27,6 +27,34 @@ CURRENCY = os.getenv("CURRENCY", "INR")
 SITE_NAME = os.getenv("SITE_NAME", "DotSwitch Labeler (Test)")
 RAZORPAY_WEBHOOK_SECRET = os.getenv("RAZORPAY_WEBHOOK_SECRET", "")
 
+# Serve the async label/payment views; set by the ASGI profile (config/gunicorn_asgi.py)
+ASYNC_VIEWS = os.getenv("DJANGO_ASYNC_VIEWS", "False").lower() in ("1", "true", "yes")
+
+# Admission control for label creation / orders (config/ratelimit.py).
+# Buckets are (refill tokens per second, burst); api_create costs one token
+# per label requested, api_create_order one per order.
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True").lower() in ("1", "true", "yes")
+RATE_LIMITS = {
+    "labels": (float(os.getenv("RATE_LIMIT_LABELS_PER_SEC", "100")), int(os.getenv("RATE_LIMIT_LABELS_BURST", "5000"))),
+    "orders": (float(os.getenv("RATE_LIMIT_ORDERS_PER_SEC", "0.2")), int(os.getenv("RATE_LIMIT_ORDERS_BURST", "5"))),
+}
+BULK_CREATE_MIN_UNITS = int(os.getenv("BULK_CREATE_MIN_UNITS", "100"))  # creates this big count as bulk
+BULK_CREATE_MAX_IN_FLIGHT = int(os.getenv("BULK_CREATE_MAX_IN_FLIGHT", "4"))  # across all workers
+
+# Default label code template (see labels/codes.py); accounts can override it
+LABEL_CODE_TEMPLATE = os.getenv("LABEL_CODE_TEMPLATE", "{prefix}-{name}-{type}-{category}-{index:3}")
+
+# Cold storage for archived labels (manage.py archive_labels). Must be durable
+# storage every web host mounts: segments are written once, by the host that
+# ran the command, and an ephemeral dyno filesystem loses them on restart.
+LABEL_ARCHIVE_DIR = Path(os.getenv("LABEL_ARCHIVE_DIR", BASE_DIR / "archive"))
+LABEL_ARCHIVE_BLOCK_ROWS = int(os.getenv("LABEL_ARCHIVE_BLOCK_ROWS", "256"))  # rows per gzip block
+
+# Bulk scan-resolve (/api/resolve/)
+LABELS_RESOLVE_MAX_CODES = int(os.getenv("LABELS_RESOLVE_MAX_CODES", "5000"))
+LABELS_RESOLVE_CHUNK_SIZE = int(os.getenv("LABELS_RESOLVE_CHUNK_SIZE", "500"))  # stays under SQLite's 999 params
+LABELS_RESOLVE_PREFIX_FILTER = os.getenv("LABELS_RESOLVE_PREFIX_FILTER", "True").lower() in ("1", "true", "yes")
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -62,6 +90,7 @@ MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     'django.middleware.security.SecurityMiddleware',
+    "config.db_router.ReplicaPinMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -100,10 +129,80 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Persistent connections: reuse a worker's connection for CONN_MAX_AGE seconds,
+# pinging it first when it is reused after an idle gap.
+CONN_MAX_AGE = int(os.getenv("DJANGO_CONN_MAX_AGE", "60"))
+CONN_HEALTH_CHECKS = os.getenv("DJANGO_CONN_HEALTH_CHECKS", "True").lower() in ("1", "true", "yes")
+# Not under ASGI: each sync_to_async thread opens its own connection and
+# nothing closes a persistent one, so they would leak.
+if ASYNC_VIEWS:
+    CONN_MAX_AGE = 0
+
 DATABASES = {
-    "default": dj_database_url.config(default=f"sqlite:///{BASE_DIR/'db.sqlite3'}")
+    "default": dj_database_url.config(
+        default=f"sqlite:///{BASE_DIR/'db.sqlite3'}",
+        conn_max_age=CONN_MAX_AGE,
+        conn_health_checks=CONN_HEALTH_CHECKS,
+    )
 }
 
+# Read replicas: comma-separated URLs, exposed as replica_0, replica_1, ...
+# In tests they mirror "default" so two SQLite files behave like one.
+for _i, _url in enumerate(u for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u):
+    DATABASES[f"replica_{_i}"] = {
+        **dj_database_url.parse(_url, conn_max_age=CONN_MAX_AGE, conn_health_checks=CONN_HEALTH_CHECKS),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith("replica_")]
+DATABASE_ROUTERS = ["config.db_router.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))  # read-your-writes window
+
+# Opt-in tuning for running the SQLite fallback under several workers.
+# WAL lets readers proceed alongside the writer; IMMEDIATE transactions take
+# the write lock at BEGIN so concurrent api_create calls wait on the busy
+# timeout instead of failing with "database is locked" on lock upgrade.
+SQLITE_TUNING = os.getenv("DJANGO_SQLITE_TUNING", "False").lower() in ("1", "true", "yes")
+if SQLITE_TUNING and DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    DATABASES["default"].setdefault("OPTIONS", {}).update({
+        "timeout": float(os.getenv("SQLITE_BUSY_TIMEOUT", "20")),  # seconds -> sqlite busy_timeout
+        "transaction_mode": "IMMEDIATE",
+        "init_command": ";".join([
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024)))}",
+            f"PRAGMA cache_size={int(os.getenv('SQLITE_CACHE_SIZE', '-20000'))}",  # negative = KiB
+        ]),
+    })
+
+# Cache: local memory by default; point at redis/memcached in production, e.g.
+# DJANGO_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# DJANGO_CACHE_LOCATION=redis://127.0.0.1:6379/1
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("DJANGO_CACHE_LOCATION", ""),
+    }
+}
+
+# "cached_db" serves sessions from the cache, "signed_cookies" skips storage
+SESSION_ENGINE = "django.contrib.sessions.backends." + os.getenv("DJANGO_SESSION_ENGINE", "db")
+
+AUTHENTICATION_BACKENDS = [
+    "accounts.backends.CachedModelBackend",
+    # kept so sessions created before the cached backend stay valid
+    "django.contrib.auth.backends.ModelBackend",
+]
+# Changes only evict the cached user from the cache they run against; with a
+# per-process cache the other workers would keep serving stale credits, so
+# the user cache is off unless the cache is shared (accounts.W001).
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+AUTH_USER_CACHE_TTL = int(os.getenv(  # seconds, 0 disables
+    "AUTH_USER_CACHE_TTL", "0" if CACHES["default"]["BACKEND"] in PROCESS_LOCAL_CACHES else "30"
+))
+
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 SECURE_SSL_REDIRECT = os.getenv("DJANGO_SECURE_SSL_REDIRECT", "True").lower() in ("1","true","yes")
 SESSION_COOKIE_SECURE = True
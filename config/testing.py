@@ -0,0 +1,77 @@
+# config/testing.py
+"""
+Query and latency budgets for the endpoint regression tests
+(labels/tests.py, accounts/tests.py).
+
+    with self.assertMaxQueries(3):
+        self.client.get(...)
+
+    with self.assertWithinBudget(0.25):
+        self.client.post(...)
+
+Failures list the captured SQL (slowest first for time budgets), so an
+N+1 or a slow scan shows up in the test output rather than in production.
+PERF_BUDGET_SCALE multiplies every time budget for slow CI machines.
+
+AsyncViewsURLConf routes the native async views under the sync views' URL
+names, so the same tests can cover both:
+
+    @override_settings(ROOT_URLCONF=AsyncViewsURLConf)
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+
+from accounts import views as accounts_views
+from labels import views as labels_views
+
+PERF_BUDGET_SCALE = float(os.getenv("PERF_BUDGET_SCALE", "1"))
+
+
+def _shorten(sql, width=300):
+    return sql if len(sql) <= width else f"{sql[:width]} ... ({len(sql)} chars)"
+
+
+def format_queries(queries, limit=20):
+    lines = [f"  {n}. [{q['time']}s] {_shorten(q['sql'])}" for n, q in enumerate(queries[:limit], start=1)]
+    if len(queries) > limit:
+        lines.append(f"  ... {len(queries) - limit} more")
+    return "\n".join(lines)
+
+
+class QueryBudgetMixin:
+    @contextmanager
+    def assertMaxQueries(self, budget):
+        with CaptureQueriesContext(connection) as ctx:
+            yield ctx
+        if len(ctx) > budget:
+            self.fail(f"{len(ctx)} queries, budget is {budget}:\n{format_queries(ctx.captured_queries)}")
+
+    @contextmanager
+    def assertWithinBudget(self, seconds):
+        budget = seconds * PERF_BUDGET_SCALE
+        with CaptureQueriesContext(connection) as ctx:
+            t0 = time.perf_counter()
+            yield ctx
+            elapsed = time.perf_counter() - t0
+        if elapsed > budget:
+            slowest = sorted(ctx.captured_queries, key=lambda q: -float(q["time"]))
+            self.fail(f"took {elapsed * 1000:.0f}ms, budget is {budget * 1000:.0f}ms "
+                      f"({len(ctx)} queries, slowest first):\n{format_queries(slowest, limit=5)}")
+
+
+class AsyncViewsURLConf:
+    """The project URLconf with the async variants DJANGO_ASYNC_VIEWS=1 serves."""
+    urlpatterns = [
+        # same paths as config.urls, so they win resolution while reverse()
+        # keeps working through the names defined there
+        path("accounts/api/create-order/", accounts_views.api_create_order_async),
+        path("accounts/api/webhook/razorpay/", accounts_views.webhook_razorpay_async),
+        path("api/list/", labels_views.api_list_async),
+        path("api/create/", labels_views.api_create_async),
+        path("", include("config.urls")),
+    ]
@@ -0,0 +1,203 @@
+import json
+import os
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from labels.models import Label
+from . import admin_utils, db_router
+from .admin_utils import EstimatedCountPaginator, estimated_row_count
+from .db_router import PIN_COOKIE, ReplicaPinMiddleware, ReplicaRouter
+
+
+@override_settings(DATABASE_REPLICAS=["replica_0", "replica_1"])
+class ReplicaRouterTests(SimpleTestCase):
+    # the router never queries; "default" is only touched to open a transaction
+    databases = {"default"}
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        # writes made by earlier tests outside a request leave the pin set
+        for var in (db_router._pinned, db_router._wrote):
+            self.addCleanup(var.reset, var.set(False))
+
+    def read(self):
+        return self.router.db_for_read(Label)
+
+    def test_reads_round_robin_over_replicas(self):
+        reads = [self.read() for _ in range(4)]
+        self.assertEqual(sorted(reads), ["replica_0", "replica_0", "replica_1", "replica_1"])
+        self.assertNotEqual(reads[0], reads[1])
+        self.assertEqual(reads[0], reads[2])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_the_primary(self):
+        self.assertEqual(self.read(), "default")
+
+    def test_reads_inside_a_transaction_use_the_primary(self):
+        with transaction.atomic():
+            self.assertEqual(self.read(), "default")
+        self.assertIn(self.read(), settings.DATABASE_REPLICAS)
+
+    def test_write_pins_the_rest_of_the_request(self):
+        self.assertEqual(self.router.db_for_write(Label), "default")
+        self.assertEqual(self.read(), "default")
+
+    def view(self, request):
+        self.seen.append(self.read())
+        if request.method == "POST":
+            self.router.db_for_write(Label)
+        return HttpResponse()
+
+    def check_pin_cookie(self, call):
+        self.seen = []
+        rf = RequestFactory()
+        self.assertNotIn(PIN_COOKIE, call(rf.get("/")).cookies)
+
+        r = call(rf.post("/"))
+        self.assertEqual(r.cookies[PIN_COOKIE]["max-age"], settings.REPLICA_PIN_SECONDS)
+
+        pinned = rf.get("/")
+        pinned.COOKIES[PIN_COOKIE] = "1"
+        self.assertNotIn(PIN_COOKIE, call(pinned).cookies)  # reads don't renew it
+
+        self.assertIn(self.seen[0], settings.DATABASE_REPLICAS)
+        self.assertIn(self.seen[1], settings.DATABASE_REPLICAS)  # read before the write
+        self.assertEqual(self.seen[2], "default")
+        # the pin doesn't leak past the request
+        self.assertIn(self.read(), settings.DATABASE_REPLICAS)
+
+    def test_middleware_sets_and_honours_the_pin(self):
+        self.check_pin_cookie(ReplicaPinMiddleware(self.view))
+
+    def test_async_middleware_sets_and_honours_the_pin(self):
+        async def view(request):
+            return self.view(request)
+        self.check_pin_cookie(async_to_sync(ReplicaPinMiddleware(view)))
+
+    def test_request_end_clears_a_pin_set_outside_it(self):
+        self.router.db_for_write(Label)
+        request_finished.send(sender=self.__class__)
+        self.assertIn(self.read(), settings.DATABASE_REPLICAS)
+
+
+def replica_scenario():
+    """
+    Run by TwoFileReplicaTests in a process whose primary and replica are
+    separate SQLite files. The replica is a copy of the primary taken before
+    the write, i.e. a replica that hasn't caught up yet.
+    """
+    call_command("migrate", verbosity=0)
+    user = User.objects.create_user("replica@example.com", "pw", credits=10)
+    writer, reader = Client(), Client()
+    writer.force_login(user)
+    reader.force_login(user)
+    connections.close_all()
+    shutil.copyfile(settings.DATABASES["default"]["NAME"], settings.DATABASES["replica_0"]["NAME"])
+
+    writer.post(reverse("labels:api_create"), {"name": "fresh", "units": "1", "type": "t", "category": "c"},
+                secure=True)
+    names = lambda client: [x["name"] for x in client.get(reverse("labels:api_list"), secure=True).json()["labels"]]
+    print(json.dumps({"pinned": sorted(writer.cookies), "writer": names(writer), "reader": names(reader)}))
+
+
+class TwoFileReplicaTests(SimpleTestCase):
+    def test_pinned_client_reads_the_primary_and_others_the_replica(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "config.settings",
+               "DATABASE_URL": f"sqlite:///{tmp.name}/primary.sqlite3",
+               "DATABASE_REPLICA_URLS": f"sqlite:///{tmp.name}/replica.sqlite3"}
+        probe = ("import django; django.setup(); from django.test.utils import setup_test_environment; "
+                 "setup_test_environment(); from config.tests import replica_scenario; replica_scenario()")
+        proc = subprocess.run([sys.executable, "-c", probe], cwd=settings.BASE_DIR, env=env,
+                              capture_output=True, text=True)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        seen = json.loads(proc.stdout.splitlines()[-1])
+        self.assertIn(PIN_COOKIE, seen["pinned"])
+        self.assertEqual(seen["writer"], ["fresh"])
+        self.assertEqual(seen["reader"], [])
+
+
+class EstimatedCountTests(TestCase):
+    def test_sparse_table_gets_an_exact_count_off_postgresql(self):
+        user = User.objects.create_user("count@example.com", "pw")
+        Label.objects.bulk_create([
+            Label(user=user, name="n", sku_type="t", category="c", unit_index=i, code=f"count-{i:03d}")
+            for i in range(1, 101)
+        ])
+        # archiving leaves the pk range wide and the table sparse
+        Label.objects.exclude(unit_index__in=[1, 100]).delete()
+        qs = Label.objects.order_by("pk")
+        self.assertIsNone(estimated_row_count(qs))
+        with mock.patch.object(admin_utils, "ESTIMATE_THRESHOLD", 1):
+            self.assertEqual(EstimatedCountPaginator(qs, 10).count, 2)
+
+
+class DeploymentProfileTests(SimpleTestCase):
+    PROBE = (
+        "import django, json; django.setup(); from django.conf import settings; "
+        "print(json.dumps({a: d['CONN_MAX_AGE'] for a, d in settings.DATABASES.items()}))"
+    )
+
+    def conn_max_ages(self, **env):
+        # settings are read once per process, so load them in a fresh one
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "config.settings",
+               "DATABASE_REPLICA_URLS": "sqlite:///replica.sqlite3", **env}
+        proc = subprocess.run([sys.executable, "-c", self.PROBE], cwd=settings.BASE_DIR, env=env,
+                              capture_output=True, text=True, check=True)
+        return json.loads(proc.stdout)
+
+    def test_asgi_profile_runs_without_persistent_connections(self):
+        profile = runpy.run_path(str(settings.BASE_DIR / "config" / "gunicorn_asgi.py"))
+        env = {"DJANGO_CONN_MAX_AGE": "60", **dict(kv.split("=", 1) for kv in profile["raw_env"])}
+        self.assertEqual(self.conn_max_ages(**env), {"default": 0, "replica_0": 0})
+
+    def test_async_views_override_conn_max_age(self):
+        ages = self.conn_max_ages(DJANGO_ASYNC_VIEWS="1", DJANGO_CONN_MAX_AGE="60")
+        self.assertEqual(ages, {"default": 0, "replica_0": 0})
+        self.assertEqual(self.conn_max_ages(DJANGO_CONN_MAX_AGE="60")["default"], 60)
+
+    SQLITE_PROBE = (
+        "import django, json; django.setup(); from django.db import connection; "
+        "cursor = connection.cursor(); "
+        "pragmas = {p: cursor.execute(f'PRAGMA {p}').fetchone()[0] "
+        "for p in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size')}; "
+        "print(json.dumps({**pragmas, 'transaction_mode': connection.transaction_mode}))"
+    )
+
+    def sqlite_state(self, **env):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "config.settings",
+               "DATABASE_URL": f"sqlite:///{tmp.name}/tuned.sqlite3", **env}
+        proc = subprocess.run([sys.executable, "-c", self.SQLITE_PROBE], cwd=settings.BASE_DIR, env=env,
+                              capture_output=True, text=True, check=True)
+        return json.loads(proc.stdout)
+
+    def test_sqlite_tuning_applies_its_pragmas(self):
+        state = self.sqlite_state(DJANGO_SQLITE_TUNING="1", SQLITE_BUSY_TIMEOUT="7",
+                                  SQLITE_MMAP_SIZE=str(64 * 1024 * 1024))
+        self.assertEqual(state, {
+            "journal_mode": "wal",
+            "synchronous": 1,  # NORMAL
+            "busy_timeout": 7000,
+            "mmap_size": 64 * 1024 * 1024,
+            "transaction_mode": "IMMEDIATE",
+        })
+        # off by default: stock rollback journal, deferred transactions
+        state = self.sqlite_state(DJANGO_SQLITE_TUNING="0")
+        self.assertEqual((state["journal_mode"], state["transaction_mode"]), ("delete", None))
@@ -1,9 +1,29 @@
 from django.contrib import admin
+from django.db.models import Q
+from config.admin_utils import EstimatedCountPaginator, UserInputFilter, input_filter
 from .models import Label
 
 @admin.register(Label)
 class LabelAdmin(admin.ModelAdmin):
     list_display = ("code", "name", "sku_type", "category", "unit_index", "user", "created_at")
-    list_filter = ("sku_type", "category", "user")
+    list_select_related = ("user",)
+    # text inputs instead of DISTINCT-driven / all-users sidebars
+    list_filter = (
+        input_filter("sku_type", "SKU type"),
+        input_filter("category", "category"),
+        UserInputFilter,
+    )
+    autocomplete_fields = ("user",)
     search_fields = ("code", "name")
+    search_help_text = "Code or name prefix, case-sensitive, e.g. 9a44d71b-riwaaz or Riwaaz"
     ordering = ("-id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        # case-sensitive prefix matches can use the indexes on code and name
+        # (a range scan each, OR'd) instead of scanning with icontains
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(Q(code__startswith=term) | Q(name__startswith=term)), False
@@ -1,6 +1,29 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class LabelsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'labels'
+
+    def ready(self):
+        checks.register(check_default_code_template)
+
+
+def check_default_code_template(app_configs, **kwargs):
+    """Every account without its own template shares this one, so it must carry {prefix}."""
+    from django.conf import settings
+    from .codes import compile_template
+
+    try:
+        template = compile_template(settings.LABEL_CODE_TEMPLATE)
+    except ValueError as e:
+        return [checks.Error(f"LABEL_CODE_TEMPLATE: {e}", id="labels.E001")]
+    if not template.has_prefix:
+        return [checks.Error(
+            "LABEL_CODE_TEMPLATE must contain {prefix}; codes are numbered per account "
+            "and would collide across accounts sharing the template.",
+            hint="Give GS1 templates to individual accounts through User.code_template.",
+            id="labels.E002",
+        )]
+    return []
@@ -0,0 +1,241 @@
+# labels/archive.py
+"""
+Cold storage for old labels (see LabelArchiveSegment and the
+archive_labels command).
+
+Aged rows leave labels_label in code order and land in compressed NDJSON
+segments under settings.LABEL_ARCHIVE_DIR. The newest label of every
+(user, name, type, category) group always stays hot, so api_create keeps
+numbering from the right index. After a template change the group's newest
+label can belong to another numbering, so api_create also checks the codes
+it is about to issue against the archive (max_archived_index).
+
+Segment files are only written once, by whichever host ran archive_labels,
+so LABEL_ARCHIVE_DIR must be durable storage every web host mounts. Lookups
+log a missing file and treat its codes as not archived; iter_rows() (usage
+rebuilds) raises SegmentMissing rather than undercount.
+"""
+import bisect
+import gzip
+import hashlib
+import json
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import Label, LabelArchiveSegment
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("id", "user_id", "name", "sku_type", "category", "unit_index", "code", "credits_charged")
+
+# per-segment Bloom filter: 10 bits and 7 probes per code is ~1% false positives
+FILTER_BITS_PER_CODE = 10
+FILTER_PROBES = 7
+
+
+class SegmentMissing(Exception):
+    """A segment's file isn't in LABEL_ARCHIVE_DIR on this host."""
+
+
+def archivable(cutoff):
+    """Labels created before `cutoff` that have a higher-numbered sibling."""
+    newer_sibling = Label.objects.filter(
+        user=OuterRef("user"), name=OuterRef("name"),
+        sku_type=OuterRef("sku_type"), category=OuterRef("category"),
+        unit_index__gt=OuterRef("unit_index"),
+    )
+    return Label.objects.filter(Exists(newer_sibling), created_at__lt=cutoff)
+
+
+def _encode_blocks(rows):
+    """gzip each ARCHIVE_BLOCK_ROWS slice separately; returns (data, index)."""
+    data, index, size = bytearray(), [], settings.LABEL_ARCHIVE_BLOCK_ROWS
+    for i in range(0, len(rows), size):
+        block = rows[i:i + size]
+        payload = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in block)
+        member = gzip.compress(payload.encode(), compresslevel=6)
+        index.append([block[0]["code"], len(data), len(member)])
+        data += member
+    return bytes(data), index
+
+
+def _probes(code, nbits):
+    digest = hashlib.blake2b(code.encode(), digest_size=16).digest()
+    h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % nbits for i in range(FILTER_PROBES)]
+
+
+def code_filter(codes):
+    """Bloom filter bytes for a segment's codes."""
+    bits = bytearray((len(codes) * FILTER_BITS_PER_CODE + 7) // 8 or 1)
+    for code in codes:
+        for bit in _probes(code, len(bits) * 8):
+            bits[bit >> 3] |= 1 << (bit & 7)
+    return bytes(bits)
+
+
+def may_contain(segment, code):
+    """False only if `code` is certainly not in `segment`."""
+    bits = bytes(segment.code_filter)  # memoryview on PostgreSQL
+    if not bits:
+        return True
+    return all(bits[bit >> 3] >> (bit & 7) & 1 for bit in _probes(code, len(bits) * 8))
+
+
+def archive_batch(cutoff, after_code="", batch_size=10_000):
+    """
+    Move up to `batch_size` archivable labels (codes > after_code) into a new
+    segment. Returns (rows moved, last code) — 0 rows when nothing is left.
+
+    The batch is read, locked, on the primary in the same transaction that
+    deletes it, so a row can't change between being archived and deleted;
+    the segment file is removed again if that transaction fails.
+    """
+    root = Path(settings.LABEL_ARCHIVE_DIR)
+    path = root / f"labels-{timezone.now():%Y%m%d}-{uuid.uuid4().hex[:12]}.ndjson.gz"
+    try:
+        with transaction.atomic():
+            qs = (archivable(cutoff).using(DEFAULT_DB_ALIAS).select_for_update()
+                  .filter(code__gt=after_code).order_by("code")
+                  .values(*FIELDS, "created_at")[:batch_size])
+            rows = [{**r, "created_at": r["created_at"].isoformat(), "credits_charged": str(r["credits_charged"])}
+                    for r in qs]
+            if not rows:
+                return 0, after_code
+
+            data, index = _encode_blocks(rows)
+            root.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+            LabelArchiveSegment.objects.create(
+                path=path.name, min_code=rows[0]["code"], max_code=rows[-1]["code"],
+                row_count=len(rows), block_index=index, code_filter=code_filter([r["code"] for r in rows]),
+            )
+            Label.objects.filter(pk__in=[r["id"] for r in rows]).delete()
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return len(rows), rows[-1]["code"]
+
+
+def _read_block(segment, block):
+    _, offset, length = segment.block_index[block]
+    path = Path(settings.LABEL_ARCHIVE_DIR) / segment.path
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            payload = gzip.decompress(f.read(length))
+    except FileNotFoundError as e:
+        raise SegmentMissing(f"Archive segment {path} is missing; LABEL_ARCHIVE_DIR must be "
+                             f"durable storage shared by every host") from e
+    rows = [json.loads(line) for line in payload.splitlines()]
+    for row in rows:
+        # segments written before labels carried their charge; every label
+        # then cost 1/10 credit
+        row.setdefault("credits_charged", "0.1")
+    return rows
+
+
+def backfill_code_filters():
+    """Give segments written before code_filter existed their filter. Returns how many."""
+    done = 0
+    for seg in LabelArchiveSegment.objects.filter(code_filter=b"").iterator():
+        codes = [r["code"] for block in range(len(seg.block_index)) for r in _read_block(seg, block)]
+        seg.code_filter = code_filter(codes)
+        seg.save(update_fields=["code_filter"])
+        done += 1
+    return done
+
+
+def iter_rows():
+    """
+    Every archived row that isn't hot, segment by segment. A label that was
+    restored and archived again sits in two segments; it is yielded once.
+    """
+    seen = set()
+    for seg in LabelArchiveSegment.objects.order_by("id").iterator():
+        for block in range(len(seg.block_index)):
+            rows = [r for r in _read_block(seg, block) if r["id"] not in seen]
+            seen.update(r["id"] for r in rows)
+            hot = set(Label.objects.filter(pk__in=[r["id"] for r in rows]).values_list("pk", flat=True))
+            yield from (r for r in rows if r["id"] not in hot)
+
+
+def lookup(codes, user=None):
+    """Archived rows for the given exact codes, as {code: row}."""
+    codes = sorted(set(codes))
+    if not codes:
+        return {}
+    segments = list(LabelArchiveSegment.objects.filter(
+        Q(min_code__lte=codes[-1]) & Q(max_code__gte=codes[0])))
+
+    # group wanted codes by (segment, block) so each block is read once
+    wanted = defaultdict(set)
+    for seg in segments:
+        firsts = [b[0] for b in seg.block_index]
+        lo = bisect.bisect_left(codes, seg.min_code)
+        hi = bisect.bisect_right(codes, seg.max_code)
+        for code in codes[lo:hi]:
+            if may_contain(seg, code):
+                wanted[(seg, bisect.bisect_right(firsts, code) - 1)].add(code)
+
+    found = {}
+    for (seg, block), want in wanted.items():
+        try:
+            rows = _read_block(seg, block)
+        except SegmentMissing as e:
+            logger.error("%s", e)
+            continue
+        for row in rows:
+            if row["code"] in want and (user is None or row["user_id"] == user.pk):
+                found[row["code"]] = row
+    return found
+
+
+def max_archived_index(base):
+    """Highest unit_index among archived codes starting with `base`, or 0."""
+    upper = base + "\U0010ffff"
+    best = 0
+    for seg in LabelArchiveSegment.objects.filter(min_code__lt=upper, max_code__gte=base):
+        firsts = [b[0] for b in seg.block_index]
+        # the block holding the first code >= base through the last block starting below upper
+        for block in range(max(bisect.bisect_right(firsts, base) - 1, 0), bisect.bisect_left(firsts, upper)):
+            try:
+                rows = _read_block(seg, block)
+            except SegmentMissing as e:
+                logger.error("%s", e)
+                break
+            best = max([best, *(r["unit_index"] for r in rows if r["code"].startswith(base))])
+    return best
+
+
+def restore(codes, user=None):
+    """
+    Put archived labels back into the hot table with their original id and
+    created_at (the archive copy is kept; lookups check the hot table
+    first). Being old, they can be archived again by a later run.
+    Returns the number of labels actually inserted.
+    """
+    rows = lookup(codes, user=user)
+    if not rows:
+        return 0
+    with transaction.atomic():
+        hot = set(Label.objects.filter(code__in=list(rows)).values_list("code", flat=True))
+        wanted = {r["id"]: r for code, r in rows.items() if code not in hot}
+        Label.objects.bulk_create(
+            [Label(**{k: r[k] for k in FIELDS}) for r in wanted.values()], ignore_conflicts=True)
+        # ignore_conflicts doesn't say which rows went in; ours carry their code
+        inserted = [obj for obj in Label.objects.filter(pk__in=list(wanted)).only("id", "code")
+                    if obj.code == wanted[obj.pk]["code"]]
+        # auto_now_add stamped them with now(); put the archived time back
+        for obj in inserted:
+            obj.created_at = datetime.fromisoformat(wanted[obj.pk]["created_at"])
+        Label.objects.bulk_update(inserted, ["created_at"], batch_size=500)
+    return len(inserted)
@@ -0,0 +1,254 @@
+# labels/codes.py
+"""
+Label code templates.
+
+A template is literal text plus placeholders:
+
+    {prefix}           first 8 chars of the account's public_id ({prefix:N}
+                       may not cut it shorter)
+    {name} {type} {category}
+                       slugged SKU fields; {name:6} keeps the first 6 chars
+    {index:N}          unit index, zero-padded to at least N digits
+    {check}            GS1 mod-10 check digit over every digit before it
+                       (must be last)
+
+The default reproduces the original format:
+
+    {prefix}-{name}-{type}-{category}-{index:3}  ->  9a44d71b-riwaaz-dress-womens-001
+
+and an EAN-13 for GS1 company prefix 8901234 is "8901234{index:5}{check}".
+Codes are globally unique but numbered per account, so a template must
+keep accounts apart: either through {prefix}, or -- for GS1 codes -- by
+leading with a literal company prefix no other account's template overlaps
+(see validate_template_owner). settings.LABEL_CODE_TEMPLATE is shared by
+every account and so must contain {prefix}.
+Templates are parsed once and cached; a compiled template renders a whole
+index range per call.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from .utils import slug
+
+DEFAULT_TEMPLATE = "{prefix}-{name}-{type}-{category}-{index:3}"
+PREFIX_LENGTH = 8  # chars of public_id in {prefix}
+
+_PLACEHOLDER = re.compile(r"\{([a-z]+)(?::(\d+))?\}")
+_TEXT_FIELDS = {"prefix", "name", "type", "category"}
+
+
+class CodeTemplate:
+    def __init__(self, source):
+        self.source = source
+        # parts: ("lit", text) | ("field", name, width) | ("index", width) | ("check",)
+        self.parts = []
+        pos = 0
+        for m in _PLACEHOLDER.finditer(source):
+            self._literal(source[pos:m.start()])
+            field, width = m.group(1), int(m.group(2)) if m.group(2) else None
+            if field in _TEXT_FIELDS:
+                self.parts.append(("field", field, width))
+            elif field == "index":
+                self.parts.append(("index", width or 1))
+            elif field == "check":
+                self.parts.append(("check",))
+            else:
+                raise ValueError(f"Unknown placeholder {{{field}}}")
+            pos = m.end()
+        self._literal(source[pos:])
+
+        kinds = [p[0] for p in self.parts]
+        if kinds.count("index") != 1:
+            raise ValueError("Template needs exactly one {index} placeholder")
+        if "check" in kinds and (kinds.count("check") > 1 or kinds[-1] != "check"):
+            raise ValueError("{check} may only appear once, at the end")
+        self.has_check = "check" in kinds
+        self.has_prefix = any(p[0] == "field" and p[1] == "prefix" for p in self.parts)
+        # leading literal text, e.g. a GS1 company prefix
+        self.literal_lead = self.parts[0][1] if kinds[0] == "lit" else ""
+        self.index_width = next(p[1] for p in self.parts if p[0] == "index")
+
+    def _literal(self, text):
+        if "{" in text or "}" in text:
+            raise ValueError(f"Unbalanced brace in {text!r}")
+        if text:
+            self.parts.append(("lit", text))
+
+    def _render_fields(self, values):
+        """Literal + field parts as strings; index/check left as markers."""
+        out = []
+        for part in self.parts:
+            if part[0] == "lit":
+                out.append(part[1])
+            elif part[0] == "field":
+                v = values[part[1]]
+                out.append(v[:part[2]] if part[2] else v)
+            else:
+                out.append(part)
+        return out
+
+    def account_prefix(self, prefix):
+        """
+        Leading text every code of an account starts with (literals and
+        {prefix} only), or "" when the template doesn't lead with one.
+        """
+        out, has_prefix = [], False
+        for part in self.parts:
+            if part[0] == "lit":
+                out.append(part[1])
+            elif part[0] == "field" and part[1] == "prefix":
+                out.append(prefix[:part[2]] if part[2] else prefix)
+                has_prefix = True
+            else:
+                break
+        return "".join(out) if has_prefix else ""
+
+    def sequence_prefix(self, values):
+        """Rendered text before {index}: codes sharing it share a numbering."""
+        head = []
+        for part in self._render_fields(values):
+            if isinstance(part, tuple):
+                break
+            head.append(part)
+        return "".join(head)
+
+    def render_range(self, values, start, count):
+        """Codes for indexes start .. start+count-1."""
+        if count <= 0:
+            return []
+        w = self.index_width
+        last = start + count - 1
+        if self.has_check and len(str(last)) > w:
+            raise ValueError(f"Index {last} does not fit {{index:{w}}}")
+
+        rendered = self._render_fields(values)
+        if self.has_check:
+            rendered = rendered[:-1]
+        i = next(n for n, p in enumerate(rendered) if isinstance(p, tuple))
+        head, tail = "".join(rendered[:i]), "".join(rendered[i + 1:])
+        # one format string per batch; only the index varies per code
+        fmt = head.replace("{", "{{").replace("}", "}}") + "{0:0%dd}" % w + \
+            tail.replace("{", "{{").replace("}", "}}")
+        codes = [fmt.format(idx) for idx in range(start, last + 1)]
+        if self.has_check:
+            codes = _append_check_digits(head, tail, w, start, codes)
+        return codes
+
+
+def _append_check_digits(head, tail, width, start, codes):
+    """
+    GS1 mod-10 over the digits of each code: weights 3,1,3,... from the
+    right. Head/tail digits sit at the same positions in every code of a
+    fixed-width batch, so their weighted sum is computed once; the index
+    digits of the whole batch are summed as one NumPy array.
+    """
+    import numpy as np  # only templates with {check} pay for the import
+
+    tail_digits = [int(c) for c in tail if c.isdigit()]
+    head_digits = [int(c) for c in head if c.isdigit()]
+    # weight of a digit by its distance from the check digit
+    weight = lambda dist: 3 if dist % 2 == 1 else 1
+    n_tail = len(tail_digits)
+    static = sum(d * weight(n_tail - k) for k, d in enumerate(tail_digits))
+    static += sum(d * weight(n_tail + width + len(head_digits) - k) for k, d in enumerate(head_digits))
+    index_weights = np.array([weight(n_tail + width - k) for k in range(width)], dtype=np.int64)
+
+    # digits[i, k] = k-th digit (most significant first) of index start+i;
+    # padding beyond int64's 18 safe digits is all zeros and adds nothing
+    n = min(width, 18)
+    indexes = np.arange(start, start + len(codes), dtype=np.int64)
+    powers = 10 ** np.arange(n - 1, -1, -1, dtype=np.int64)
+    digits = indexes[:, None] // powers % 10
+    checks = (10 - (static + digits @ index_weights[width - n:]) % 10) % 10
+    return [f"{code}{check}" for code, check in zip(codes, checks.tolist())]
+
+
+def gs1_check_digit(digits: str) -> int:
+    """Check digit for a GTIN/EAN body (the digits without the check digit)."""
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(digits)))
+    return (10 - total % 10) % 10
+
+
+@lru_cache(maxsize=256)
+def compile_template(source: str) -> CodeTemplate:
+    return CodeTemplate(source or DEFAULT_TEMPLATE)
+
+
+def _user_prefix(user):
+    return str(getattr(user, "public_id", user.id))[:PREFIX_LENGTH]
+
+
+def template_for(user) -> CodeTemplate:
+    """The account's own template, else settings.LABEL_CODE_TEMPLATE."""
+    return compile_template(getattr(user, "code_template", "") or settings.LABEL_CODE_TEMPLATE)
+
+
+def account_prefix(user) -> str:
+    return template_for(user).account_prefix(_user_prefix(user))
+
+
+def issued_prefixes(user):
+    """
+    Leading texts every code the account owns starts with, current template
+    included, or None when some code may start with anything (a template
+    without {prefix}, or an account whose template history is unknown).
+    """
+    if user.code_prefixes is None:
+        return None
+    prefixes = {account_prefix(user), *user.code_prefixes}
+    return None if "" in prefixes else tuple(sorted(prefixes))
+
+
+def template_values(user, name, sku_type, category):
+    return {
+        "prefix": _user_prefix(user),
+        "name": slug(name),
+        "type": slug(sku_type),
+        "category": slug(category),
+    }
+
+
+def validate_code_template(value):
+    try:
+        template = compile_template(value)
+    except ValueError as e:
+        raise ValidationError(str(e))
+    if not (template.has_prefix or template.literal_lead):
+        raise ValidationError(
+            "Template needs {prefix} or a leading literal company prefix, "
+            "e.g. 8901234{index:5}{check}")
+    # a shorter prefix is shared by many accounts and no longer keeps them apart
+    if any(p[:2] == ("field", "prefix") and p[2] is not None and p[2] < PREFIX_LENGTH
+           for p in template.parts):
+        raise ValidationError(f"{{prefix:N}} must keep at least {PREFIX_LENGTH} characters")
+
+
+def validate_template_owner(user):
+    """
+    A template without {prefix} only keeps codes unique while no other
+    account's template can render the same text, so its literal lead must
+    not overlap (be a prefix of, or start with) another account's.
+    """
+    try:
+        template = compile_template(user.code_template)
+    except ValueError:
+        return  # already reported by validate_code_template
+    if template.has_prefix:
+        return
+    lead = template.literal_lead
+    others = (type(user).objects
+              .exclude(pk=user.pk)
+              .exclude(code_template="")
+              .exclude(code_template__contains="{prefix}")
+              .values_list("email", "code_template"))
+    for email, source in others:
+        try:
+            other = compile_template(source).literal_lead
+        except ValueError:
+            continue
+        if other and (lead.startswith(other) or other.startswith(lead)):
+            raise ValidationError(
+                {"code_template": f"Company prefix {lead!r} overlaps {email}'s template {source!r}"})
@@ -0,0 +1,42 @@
+# labels/management/commands/archive_labels.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from labels import archive
+
+
+class Command(BaseCommand):
+    help = "Move labels older than N days into compressed cold storage, or restore codes from it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, metavar="DAYS",
+                            help="Archive labels created more than DAYS days ago.")
+        parser.add_argument("--batch-size", type=int, default=10_000,
+                            help="Labels per segment/transaction (default 10000).")
+        parser.add_argument("--restore", nargs="+", metavar="CODE",
+                            help="Copy these archived codes back into the labels table.")
+
+    def handle(self, *args, **opts):
+        if opts["restore"]:
+            n = archive.restore(opts["restore"])
+            self.stdout.write(self.style.SUCCESS(f"Restored {n} label(s)."))
+            return
+        if opts["older_than"] is None:
+            raise CommandError("Pass --older-than DAYS or --restore CODE ...")
+
+        filtered = archive.backfill_code_filters()
+        if filtered:
+            self.stdout.write(f"  added code filters to {filtered} older segment(s)")
+
+        cutoff = timezone.now() - timedelta(days=opts["older_than"])
+        total, last, segments = 0, "", 0
+        while True:
+            moved, last = archive.archive_batch(cutoff, after_code=last, batch_size=opts["batch_size"])
+            if not moved:
+                break
+            total += moved
+            segments += 1
+            self.stdout.write(f"  segment {segments}: {moved} labels (up to {last})")
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} label(s) into {segments} segment(s)."))
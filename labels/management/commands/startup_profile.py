@@ -0,0 +1,82 @@
+# labels/management/commands/startup_profile.py
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter under -X importtime: boot Django the way a
+# WSGI worker does, serve one request, report timings on stdout.
+PROBE = r"""
+import io, sys, time
+t0 = time.perf_counter()
+from config.wsgi import application
+t_app = time.perf_counter()
+status = []
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": sys.argv[1], "QUERY_STRING": "",
+    "SERVER_NAME": "localhost", "SERVER_PORT": "443", "HTTP_HOST": "localhost",
+    "SERVER_PROTOCOL": "HTTP/1.1", "wsgi.version": (1, 0), "wsgi.url_scheme": "https",
+    "wsgi.input": io.BytesIO(), "wsgi.errors": sys.stderr, "wsgi.multithread": False,
+    "wsgi.multiprocess": True, "wsgi.run_once": False,
+}
+b"".join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+print("PROBE", t_app - t0, time.perf_counter() - t0, status[0].split()[0])
+"""
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def parse_importtime(stderr):
+    """-X importtime lines as (module, self_us, cumulative_us, depth)."""
+    out = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            out.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return out
+
+
+class Command(BaseCommand):
+    help = ("Boot the app in a fresh interpreter under -X importtime, serve one "
+            "request, and report import cost per module and time to first response.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/accounts/login/",
+                            help="URL path of the first request (default /accounts/login/).")
+        parser.add_argument("--limit", type=int, default=20,
+                            help="Rows per table (default 20).")
+
+    def handle(self, *args, **opts):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings"))
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE, opts["path"]],
+                              cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        wall = time.perf_counter() - t0
+        probe = [line for line in proc.stdout.splitlines() if line.startswith("PROBE ")]
+        if proc.returncode or not probe:
+            raise CommandError(f"Startup probe failed:\n{proc.stderr[-2000:]}")
+        _, t_app, t_first, status = probe[-1].split()
+
+        rows = parse_importtime(proc.stderr)
+        total_us = sum(r[1] for r in rows)
+        by_package = defaultdict(int)
+        for module, self_us, _, _ in rows:
+            by_package[module.split(".")[0]] += self_us
+
+        limit = opts["limit"]
+        self.stdout.write("Slowest modules (cumulative, includes what they import):")
+        for module, _, cum, depth in sorted(rows, key=lambda r: -r[2])[:limit]:
+            self.stdout.write(f"  {cum / 1000:9.1f}ms  {'  ' * min(depth, 4)}{module}")
+        self.stdout.write("Import cost by top-level package (self time):")
+        for package, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:limit]:
+            self.stdout.write(f"  {us / 1000:9.1f}ms  {us * 100 / total_us:5.1f}%  {package}")
+
+        self.stdout.write(f"Modules imported: {len(rows)}, total import time {total_us / 1000:.1f}ms")
+        self.stdout.write(f"Application loaded: {float(t_app) * 1000:.1f}ms")
+        self.stdout.write(f"First response ({opts['path']} -> {status}): {float(t_first) * 1000:.1f}ms "
+                          f"in-process, {wall * 1000:.1f}ms wall-clock including interpreter startup")
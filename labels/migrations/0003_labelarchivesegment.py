@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labels', '0002_label_labels_labe_user_id_051c27_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabelArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255)),
+                ('min_code', models.CharField(max_length=300)),
+                ('max_code', models.CharField(max_length=300)),
+                ('row_count', models.PositiveIntegerField()),
+                ('block_index', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['min_code', 'max_code'], name='labels_labe_min_cod_0f343e_idx')],
+            },
+        ),
+    ]
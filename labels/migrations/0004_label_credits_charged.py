@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:04
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def backfill_charge(apps, schema_editor):
+    # every existing label was bought through api_create at 1 credit = 10 labels
+    apps.get_model("labels", "Label").objects.update(credits_charged=Decimal("0.1"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labels', '0003_labelarchivesegment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='label',
+            name='credits_charged',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=8),
+        ),
+        migrations.RunPython(backfill_charge, migrations.RunPython.noop),
+    ]
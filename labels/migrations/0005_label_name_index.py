@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labels', '0004_label_credits_charged'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='label',
+            name='name',
+            field=models.CharField(db_index=True, max_length=120),
+        ),
+    ]
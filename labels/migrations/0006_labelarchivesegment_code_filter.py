@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labels', '0005_label_name_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='labelarchivesegment',
+            name='code_filter',
+            field=models.BinaryField(default=b''),
+        ),
+    ]
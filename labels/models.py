@@ -8,13 +8,15 @@ class Label(models.Model):
         on_delete=models.CASCADE,
         related_name="labels"
     )
-    name = models.CharField(max_length=120)
+    name = models.CharField(max_length=120, db_index=True)  # admin name-prefix search
     sku_type = models.CharField(max_length=80)
     category = models.CharField(max_length=80)
     unit_index = models.PositiveIntegerField()
     # Globally unique code now
     code = models.CharField(max_length=300, unique=True)  # e.g., <userId>-name-type-category-001
     created_at = models.DateTimeField(auto_now_add=True)
+    # share of the api_create charge; the usage rollups are rebuilt from it
+    credits_charged = models.DecimalField(max_digits=8, decimal_places=4, default=0)
 
     class Meta:
         # NOTE: removed unique_together = (("user", "code"),)
@@ -27,3 +29,29 @@ class Label(models.Model):
 
     def __str__(self):
         return self.code
+
+
+class LabelArchiveSegment(models.Model):
+    """
+    One gzip'd NDJSON file of archived labels, sorted by code and written as
+    independent gzip members of ARCHIVE_BLOCK_ROWS rows each. block_index
+    holds [first_code, byte_offset, byte_length] per member, so an exact
+    code lookup decompresses a single block. Segments from different runs
+    overlap in code range, so code_filter (a Bloom filter of the segment's
+    codes) lets a lookup skip segments that can't hold the code.
+    """
+    path = models.CharField(max_length=255)
+    min_code = models.CharField(max_length=300)
+    max_code = models.CharField(max_length=300)
+    row_count = models.PositiveIntegerField()
+    block_index = models.JSONField(default=list)
+    code_filter = models.BinaryField(default=b"")  # empty: written before filters, always read
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["min_code", "max_code"]),
+        ]
+
+    def __str__(self):
+        return f"{self.path} ({self.row_count} labels)"
@@ -0,0 +1,39 @@
+# labels/symbols/__init__.py
+"""
+2D symbols (QR, Data Matrix) for labels whose payload is more than the
+code alone. Encoders take byte strings and return module matrices;
+encode_batch() groups symbols of the same shape so their Reed–Solomon and
+module placement run as NumPy batch operations.
+"""
+from .datamatrix import encode_datamatrix, encode_datamatrix_batch
+from .qr import encode_qr, encode_qr_batch
+from .render import to_png, to_svg
+
+# format -> (batch encoder, quiet zone in modules)
+FORMATS = {
+    "qr": (encode_qr_batch, 4),
+    "datamatrix": (encode_datamatrix_batch, 1),
+}
+
+
+def encode_batch(fmt, payloads, skip_oversized=False):
+    """
+    Module matrices for `payloads` (str or bytes) in format `fmt`. With
+    skip_oversized a payload too long for the format comes back as None
+    instead of failing the whole batch.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown symbol format {fmt!r}")
+    encoder, _ = FORMATS[fmt]
+    return encoder([p.encode() if isinstance(p, str) else p for p in payloads], skip_oversized=skip_oversized)
+
+
+def quiet_zone(fmt):
+    return FORMATS[fmt][1]
+
+
+__all__ = [
+    "FORMATS", "encode_batch", "quiet_zone",
+    "encode_qr", "encode_qr_batch", "encode_datamatrix", "encode_datamatrix_batch",
+    "to_svg", "to_png",
+]
@@ -0,0 +1,211 @@
+# labels/symbols/datamatrix.py
+"""
+Data Matrix ECC200 encoder: ASCII encodation (digit pairs packed, bytes
+above 127 via Upper Shift), square symbols 10x10 to 104x104.
+
+The module placement of a symbol size never changes, so it is computed
+once as index arrays (which codeword, which bit) and a whole batch of
+same-size symbols is filled with a single NumPy gather.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from .reedsolomon import DATAMATRIX_FIELD
+
+# symbol size, data region size, regions per side, data codewords,
+# ecc codewords, interleaved blocks
+SIZES = [
+    (10, 8, 1, 3, 5, 1),
+    (12, 10, 1, 5, 7, 1),
+    (14, 12, 1, 8, 10, 1),
+    (16, 14, 1, 12, 12, 1),
+    (18, 16, 1, 18, 14, 1),
+    (20, 18, 1, 22, 18, 1),
+    (22, 20, 1, 30, 20, 1),
+    (24, 22, 1, 36, 24, 1),
+    (26, 24, 1, 44, 28, 1),
+    (32, 14, 2, 62, 36, 1),
+    (36, 16, 2, 86, 42, 1),
+    (40, 18, 2, 114, 48, 1),
+    (44, 20, 2, 144, 56, 1),
+    (48, 22, 2, 174, 68, 1),
+    (52, 24, 2, 204, 84, 2),
+    (64, 14, 4, 280, 112, 2),
+    (72, 16, 4, 368, 144, 4),
+    (80, 18, 4, 456, 192, 4),
+    (88, 20, 4, 576, 224, 4),
+    (96, 22, 4, 696, 272, 4),
+    (104, 24, 4, 816, 336, 6),
+]
+
+PAD = 129
+UPPER_SHIFT = 235
+
+
+def ascii_codewords(payload: bytes):
+    out, i = [], 0
+    while i < len(payload):
+        c = payload[i]
+        if 48 <= c <= 57 and i + 1 < len(payload) and 48 <= payload[i + 1] <= 57:
+            out.append(130 + (c - 48) * 10 + payload[i + 1] - 48)
+            i += 2
+            continue
+        if c > 127:
+            out += [UPPER_SHIFT, c - 127]
+        else:
+            out.append(c + 1)
+        i += 1
+    return out
+
+
+def choose_size(n_codewords):
+    for spec in SIZES:
+        if n_codewords <= spec[3]:
+            return spec
+    raise ValueError(f"{n_codewords} codewords do not fit a {SIZES[-1][0]}x{SIZES[-1][0]} Data Matrix")
+
+
+def padded(codewords, capacity):
+    out = list(codewords)
+    if len(out) < capacity:
+        out.append(PAD)
+    while len(out) < capacity:
+        pos = len(out) + 1
+        value = PAD + (149 * pos) % 253 + 1
+        out.append(value if value <= 254 else value - 254)
+    return out
+
+
+@lru_cache(maxsize=len(SIZES))
+def _placement(nrow, ncol):
+    """
+    ECC200 module placement for the nrow x ncol mapping matrix (the data
+    regions without their finder patterns). Returns (codeword, bit) arrays
+    with codeword -1 for the fixed corner modules that no codeword reaches,
+    and the light/dark value of those.
+    """
+    cw = np.full((nrow, ncol), -1, dtype=np.intp)
+    bit = np.zeros((nrow, ncol), dtype=np.intp)
+
+    def module(r, c, k, b):
+        if r < 0:
+            r += nrow
+            c += 4 - ((nrow + 4) % 8)
+        if c < 0:
+            c += ncol
+            r += 4 - ((ncol + 4) % 8)
+        cw[r, c], bit[r, c] = k, b
+
+    def utah(r, c, k):
+        for b, (dr, dc) in enumerate(((-2, -2), (-2, -1), (-1, -2), (-1, -1), (-1, 0), (0, -2), (0, -1), (0, 0))):
+            module(r + dr, c + dc, k, b)
+
+    def corner(k, cells):
+        for b, (r, c) in enumerate(cells):
+            module(r, c, k, b)
+
+    n, c, k = nrow, ncol, 0
+    row, col = 4, 0
+    while True:
+        if row == n and col == 0:
+            corner(k, [(n - 1, 0), (n - 1, 1), (n - 1, 2), (0, c - 2), (0, c - 1), (1, c - 1), (2, c - 1), (3, c - 1)])
+            k += 1
+        if row == n - 2 and col == 0 and c % 4:
+            corner(k, [(n - 3, 0), (n - 2, 0), (n - 1, 0), (0, c - 4), (0, c - 3), (0, c - 2), (0, c - 1), (1, c - 1)])
+            k += 1
+        if row == n - 2 and col == 0 and c % 8 == 4:
+            corner(k, [(n - 3, 0), (n - 2, 0), (n - 1, 0), (0, c - 2), (0, c - 1), (1, c - 1), (2, c - 1), (3, c - 1)])
+            k += 1
+        if row == n + 4 and col == 2 and not c % 8:
+            corner(k, [(n - 1, 0), (n - 1, c - 1), (0, c - 3), (0, c - 2), (0, c - 1), (1, c - 3), (1, c - 2), (1, c - 1)])
+            k += 1
+        while True:  # sweep up and right
+            if row < n and col >= 0 and cw[row, col] < 0:
+                utah(row, col, k)
+                k += 1
+            row, col = row - 2, col + 2
+            if not (row >= 0 and col < c):
+                break
+        row, col = row + 1, col + 3
+        while True:  # sweep down and left
+            if row >= 0 and col < c and cw[row, col] < 0:
+                utah(row, col, k)
+                k += 1
+            row, col = row + 2, col - 2
+            if not (row < n and col >= 0):
+                break
+        row, col = row + 3, col + 1
+        if not (row < n or col < c):
+            break
+
+    # an untouched bottom-right corner gets a fixed checkerboard
+    fixed = np.zeros((nrow, ncol), dtype=bool)
+    if cw[n - 1, c - 1] < 0:
+        fixed[n - 1, c - 1] = fixed[n - 2, c - 2] = True
+    return cw, bit, fixed
+
+
+@lru_cache(maxsize=len(SIZES))
+def _frame(size, region, per_side):
+    """Finder/clock patterns of a symbol, and where the mapping matrix goes."""
+    frame = np.zeros((size, size), dtype=bool)
+    step = region + 2
+    for rr in range(per_side):
+        for rc in range(per_side):
+            top, left = rr * step, rc * step
+            frame[top + step - 1, left:left + step] = True       # solid bottom
+            frame[top:top + step, left] = True                    # solid left
+            frame[top, left:left + step:2] = True                 # clock on top
+            frame[top + 1:top + step:2, left + step - 1] = True   # clock on right
+    inner = np.array([i for i in range(size) if i % step not in (0, step - 1)])
+    return frame, inner
+
+
+def _ecc_interleaved(data, ecc, blocks):
+    """Reed–Solomon over `blocks` interleaved blocks, for a batch (rows)."""
+    out = np.zeros((data.shape[0], ecc), dtype=np.uint8)
+    per_block = ecc // blocks
+    for b in range(blocks):
+        out[:, b::blocks] = DATAMATRIX_FIELD.ecc_batch(data[:, b::blocks], per_block, 1)
+    return out
+
+
+def encode_datamatrix_batch(payloads, skip_oversized=False):
+    """
+    Module matrices (bool, True = dark, no quiet zone) for a list of byte
+    strings, in order. A payload that doesn't fit raises ValueError, or
+    gets None with skip_oversized.
+    """
+    by_size = {}
+    codewords = [ascii_codewords(p) for p in payloads]
+    for n, cws in enumerate(codewords):
+        try:
+            spec = choose_size(len(cws))
+        except ValueError:
+            if not skip_oversized:
+                raise
+            continue
+        by_size.setdefault(spec, []).append(n)
+
+    out = [None] * len(payloads)
+    for spec, members in by_size.items():
+        size, region, per_side, ndata, necc, blocks = spec
+        data = np.array([padded(codewords[n], ndata) for n in members], dtype=np.uint8)
+        full = np.concatenate([data, _ecc_interleaved(data, necc, blocks)], axis=1)
+
+        cw, bit, fixed = _placement(region * per_side, region * per_side)
+        reached = cw >= 0
+        mapping = np.broadcast_to(fixed, (len(members),) + fixed.shape).copy()
+        mapping[:, reached] = (full[:, cw[reached]] >> (7 - bit[reached])) & 1
+
+        frame, inner = _frame(size, region, per_side)
+        symbols = np.broadcast_to(frame, (len(members), size, size)).copy()
+        symbols[:, inner[:, None], inner[None, :]] = mapping
+        for k, n in enumerate(members):
+            out[n] = symbols[k]
+    return out
+
+
+def encode_datamatrix(payload: bytes):
+    return encode_datamatrix_batch([payload])[0]
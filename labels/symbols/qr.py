@@ -0,0 +1,408 @@
+# labels/symbols/qr.py
+"""
+QR Code model 2 encoder: byte mode, versions 1-40, levels L/M/Q/H.
+
+Version 40 holds 2331 bytes at level M, more than any label payload (the
+SKU fields top out around 600). Everything that depends only on the version
+(function patterns, the zigzag data order, the eight mask patterns) is built
+once and cached, so a batch is encoded as:
+
+    payload bytes -> codewords (per symbol, plain Python)
+    Reed–Solomon  -> one ecc_batch() per block shape across the batch
+    placement     -> one fancy-indexed assignment per version
+    masking       -> all eight masks scored at once, on bit-packed rows
+                     for versions 1-10 and on bool arrays past that
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from .reedsolomon import QR_FIELD
+
+MAX_VERSION = 40
+LEVELS = {"L": 1, "M": 0, "Q": 3, "H": 2}  # format-info bits per level
+
+# ISO/IEC 18004 table 9, versions 1..40: ecc codewords per block, and blocks
+ECC_PER_BLOCK = {
+    "L": (7, 10, 15, 20, 26, 18, 20, 24, 30, 18, 20, 24, 26, 30, 22, 24, 28, 30, 28, 28,
+          28, 28, 30, 30, 26, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    "M": (10, 16, 26, 18, 24, 16, 18, 22, 22, 26, 30, 22, 22, 24, 24, 28, 28, 26, 26, 26,
+          26, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28),
+    "Q": (13, 22, 18, 26, 18, 24, 18, 22, 20, 24, 28, 26, 24, 20, 30, 24, 28, 28, 26, 30,
+          28, 30, 30, 30, 30, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    "H": (17, 28, 22, 16, 22, 28, 26, 26, 24, 28, 24, 28, 22, 24, 24, 30, 28, 28, 26, 28,
+          30, 24, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+}
+NUM_BLOCKS = {
+    "L": (1, 1, 1, 1, 1, 2, 2, 2, 2, 4, 4, 4, 4, 4, 6, 6, 6, 6, 7, 8,
+          8, 9, 9, 10, 12, 12, 12, 13, 14, 15, 16, 17, 18, 19, 19, 20, 21, 22, 24, 25),
+    "M": (1, 1, 1, 2, 2, 4, 4, 4, 5, 5, 5, 8, 9, 9, 10, 10, 11, 13, 14, 16,
+          17, 17, 18, 20, 21, 23, 25, 26, 28, 29, 31, 33, 35, 37, 38, 40, 43, 45, 47, 49),
+    "Q": (1, 1, 2, 2, 4, 4, 6, 6, 8, 8, 8, 10, 12, 16, 12, 17, 16, 18, 21, 20,
+          23, 23, 25, 27, 29, 34, 34, 35, 38, 40, 43, 45, 48, 51, 53, 56, 59, 62, 65, 68),
+    "H": (1, 1, 2, 4, 4, 4, 5, 6, 8, 8, 11, 11, 16, 16, 18, 16, 19, 21, 25, 25,
+          25, 34, 30, 32, 35, 37, 40, 42, 45, 48, 51, 54, 57, 60, 63, 66, 70, 74, 77, 81),
+}
+
+MASK_PENALTY_CHUNK = 1024          # symbols scored per packed NumPy pass
+MASK_PENALTY_BYTES = 32 * 1024 * 1024  # bool candidates held per unpacked pass
+
+
+def _codeword_count(version):
+    """All codewords (data + ecc) a version holds."""
+    modules = (16 * version + 128) * version + 64
+    if version >= 2:
+        align = version // 7 + 2
+        modules -= (25 * align - 10) * align - 55
+        if version >= 7:
+            modules -= 36  # version information
+    return modules // 8
+
+
+def _blocks(version, level):
+    """(ecc per block, data codewords of each block); later blocks may hold one more."""
+    ecc = ECC_PER_BLOCK[level][version - 1]
+    blocks = NUM_BLOCKS[level][version - 1]
+    total = _codeword_count(version)
+    short, longer = divmod(total, blocks)
+    return ecc, [short - ecc] * (blocks - longer) + [short - ecc + 1] * longer
+
+
+def data_capacity(version, level):
+    """Data codewords of a version/level."""
+    return sum(_blocks(version, level)[1])
+
+
+def _count_bits(version):
+    return 8 if version < 10 else 16
+
+
+def choose_version(length, level):
+    for version in range(1, MAX_VERSION + 1):
+        if 4 + _count_bits(version) + 8 * length <= 8 * data_capacity(version, level):
+            return version
+    raise ValueError(f"{length} bytes do not fit a version {MAX_VERSION} QR code at level {level}")
+
+
+def data_codewords(payload: bytes, version, level):
+    """Mode indicator, count, payload, terminator and pad bytes."""
+    capacity = data_capacity(version, level)
+    bits = (0b0100 << _count_bits(version)) | len(payload)
+    nbits = 4 + _count_bits(version)
+    value = int.from_bytes(payload, "big") if payload else 0
+    bits, nbits = (bits << (8 * len(payload))) | value, nbits + 8 * len(payload)
+    term = min(4, capacity * 8 - nbits)
+    bits, nbits = bits << term, nbits + term
+    slack = -nbits % 8
+    bits, nbits = bits << slack, nbits + slack
+    out = list(bits.to_bytes(nbits // 8, "big"))
+    out += [0xEC, 0x11] * ((capacity - len(out)) // 2 + 1)
+    return out[:capacity]
+
+
+# --- version layout ------------------------------------------------------
+
+def _alignment_positions(version):
+    if version == 1:
+        return []
+    count = version // 7 + 2
+    step = (version * 8 + count * 3 + 5) // (count * 4 - 4) * 2
+    return [6] + [version * 4 + 10 - i * step for i in range(count - 1)][::-1]
+
+
+def _bch(value, poly, degree):
+    rem = value
+    for _ in range(degree):
+        rem = (rem << 1) ^ ((rem >> (degree - 1)) * poly)
+    return (value << degree) | rem
+
+
+def _format_bits(level, mask):
+    return _bch(LEVELS[level] << 3 | mask, 0x537, 10) ^ 0x5412
+
+
+class Layout:
+    """Function patterns and data module order of one version."""
+
+    def __init__(self, version):
+        self.version = version
+        size = self.size = version * 4 + 17
+        self.fixed = np.zeros((size, size), dtype=bool)     # dark function modules
+        self.function = np.zeros((size, size), dtype=bool)  # every reserved module
+
+        def put(x, y, dark):
+            self.fixed[y, x] = dark
+            self.function[y, x] = True
+
+        for i in range(size):
+            put(6, i, i % 2 == 0)
+            put(i, 6, i % 2 == 0)
+        for cx, cy in ((3, 3), (size - 4, 3), (3, size - 4)):
+            for dy in range(-4, 5):
+                for dx in range(-4, 5):
+                    x, y = cx + dx, cy + dy
+                    if 0 <= x < size and 0 <= y < size:
+                        put(x, y, max(abs(dx), abs(dy)) not in (2, 4))
+        align = _alignment_positions(version)
+        for i, cx in enumerate(align):
+            for j, cy in enumerate(align):
+                if (i, j) in ((0, 0), (0, len(align) - 1), (len(align) - 1, 0)):
+                    continue
+                for dy in range(-2, 3):
+                    for dx in range(-2, 3):
+                        put(cx + dx, cy + dy, max(abs(dx), abs(dy)) != 1)
+
+        # format areas (filled per mask), then the always-dark module
+        self.format_cells = self._format_cells()
+        for x, y in self.format_cells:
+            put(x, y, False)
+        put(8, size - 8, True)
+        if version >= 7:
+            bits = _bch(version, 0x1F25, 12)
+            for i in range(18):
+                a, b = size - 11 + i % 3, i // 3
+                put(a, b, (bits >> i) & 1)
+                put(b, a, (bits >> i) & 1)
+
+        rows, cols = [], []
+        for right in range(size - 1, 0, -2):
+            if right <= 6:
+                right -= 1
+            upward = (right + 1) & 2 == 0
+            for vert in range(size):
+                y = size - 1 - vert if upward else vert
+                for x in (right, right - 1):
+                    if not self.function[y, x]:
+                        rows.append(y)
+                        cols.append(x)
+        self.data_rows, self.data_cols = np.array(rows), np.array(cols)
+
+        y, x = np.indices((size, size))
+        patterns = np.stack([
+            (x + y) % 2 == 0,
+            y % 2 == 0,
+            x % 3 == 0,
+            (x + y) % 3 == 0,
+            (x // 3 + y // 2) % 2 == 0,
+            x * y % 2 + x * y % 3 == 0,
+            (x * y % 2 + x * y % 3) % 2 == 0,
+            ((x + y) % 2 + x * y % 3) % 2 == 0,
+        ])
+        self.masks = patterns & ~self.function
+        self.packed_masks = pack(self.masks) if size <= PACKED_MAX_SIZE else None
+
+    def _format_cells(self):
+        """(x, y) of format bits 0..14, first copy then second copy."""
+        s = self.size
+        first = [(8, i) for i in range(6)] + [(8, 7), (8, 8), (7, 8)] + [(14 - i, 8) for i in range(9, 15)]
+        second = [(s - 1 - i, 8) for i in range(8)] + [(8, s - 15 + i) for i in range(8, 15)]
+        return first + second
+
+    @lru_cache(maxsize=4)
+    def packed_fixed(self, level):
+        return pack(self.fixed_with_format(level))
+
+    @lru_cache(maxsize=4)
+    def fixed_with_format(self, level):
+        """Function modules including the format info, for masks 0..7."""
+        out = np.repeat(self.fixed[None], 8, axis=0)
+        for mask in range(8):
+            bits = _format_bits(level, mask)
+            for i, (x, y) in enumerate(self.format_cells):
+                out[mask, y, x] = (bits >> (i % 15)) & 1
+        return out
+
+
+@lru_cache(maxsize=MAX_VERSION)
+def layout(version):
+    return Layout(version)
+
+
+# --- mask selection ------------------------------------------------------
+#
+# Rows are scored as bit masks: every row (and column) of a candidate is
+# packed into one uint64, bit j = module j, so each penalty rule is a few
+# shifts, ANDs and popcounts per row instead of per module. The finder rule
+# looks four modules past the edge, so this holds up to 60 modules (versions
+# 1-10). Wider symbols are scored by the same rules on bool arrays
+# (mask_penalties_unpacked), where the shifts become slices.
+
+PACKED_MAX_SIZE = 60
+
+def _pack_rows(m):
+    """(..., rows, n) bool -> (..., rows) uint64."""
+    packed = np.packbits(m, axis=-1, bitorder="little")
+    packed = np.pad(packed, [(0, 0)] * (packed.ndim - 1) + [(0, 8 - packed.shape[-1])])
+    return np.ascontiguousarray(packed).view("<u8")[..., 0]
+
+
+def _popcount(bits):
+    return np.bitwise_count(bits).sum(axis=-1, dtype=np.int64)
+
+
+def _low_bits(n):
+    return np.uint64((1 << n) - 1)
+
+
+def _run_penalty(rows, n):
+    """Rule 1: 3 + (k - 5) per run of k >= 5 same-colour modules."""
+    same = ~(rows ^ (rows >> 1))  # bit j: module j == module j+1
+    five = same & (same >> 1) & (same >> 2) & (same >> 3) & _low_bits(n - 4)
+    starts = five & ~(five << 1)
+    return _popcount(five) + 2 * _popcount(starts)
+
+
+def _block_penalty(rows, n):
+    """Rule 2: 3 per 2x2 block of one colour."""
+    a, b = rows[..., :-1], rows[..., 1:]
+    rows_agree = ~(a ^ b)
+    block = rows_agree & (rows_agree >> 1) & ~(a ^ (a >> 1)) & _low_bits(n - 1)
+    return 3 * _popcount(block)
+
+
+_FINDER_CORE = (1, 0, 1, 1, 1, 0, 1)
+
+
+def _finder_penalty(rows, n):
+    """
+    Rule 3: 40 per dark-light-dark(3)-light-dark run with four light
+    modules before or after it (outside the symbol counts as light).
+    """
+    light = ~rows  # bits past the edge come out light, like the quiet zone
+    core = _low_bits(n - 6)
+    for k, dark in enumerate(_FINDER_CORE):
+        core = core & ((rows if dark else light) >> k)
+    before = after = ~np.uint64(0)
+    for k in range(1, 5):
+        before = before & ((light << k) | _low_bits(k))
+        after = after & (light >> (6 + k))
+    return 40 * _popcount(core & (before | after))
+
+
+def pack(m):
+    """Packed rows and packed columns of (..., n, n) bool matrices."""
+    return _pack_rows(m), _pack_rows(np.swapaxes(m, -1, -2))
+
+
+def mask_penalties(rows, cols, n):
+    """ISO 18004 penalty score per candidate, from pack()ed modules."""
+    score = _run_penalty(rows, n) + _run_penalty(cols, n)
+    score += _block_penalty(rows, n)
+    score += _finder_penalty(rows, n) + _finder_penalty(cols, n)
+    dark = _popcount(rows)
+    return score + 10 * (np.abs(dark * 20 - n * n * 10) // (n * n))
+
+
+def _run_penalty_unpacked(m):
+    same = m[..., 1:] == m[..., :-1]  # module j == module j+1
+    five = same[..., :-3] & same[..., 1:-2] & same[..., 2:-1] & same[..., 3:]
+    starts = five.copy()
+    starts[..., 1:] &= ~five[..., :-1]
+    return five.sum(axis=(-2, -1)) + 2 * starts.sum(axis=(-2, -1))
+
+
+def _block_penalty_unpacked(m):
+    a, b = m[..., :-1, :], m[..., 1:, :]
+    rows_agree = a == b
+    block = rows_agree[..., :-1] & rows_agree[..., 1:] & (a[..., :-1] == a[..., 1:])
+    return 3 * block.sum(axis=(-2, -1))
+
+
+def _finder_penalty_unpacked(m):
+    # four light modules of quiet zone on either side
+    light = ~np.pad(m, [(0, 0)] * (m.ndim - 1) + [(4, 4)])
+    w = m.shape[-1] - 6
+    core = np.ones(m.shape[:-1] + (w,), dtype=bool)
+    for k, dark in enumerate(_FINDER_CORE):
+        core &= ~light[..., 4 + k:4 + k + w] if dark else light[..., 4 + k:4 + k + w]
+    before = np.logical_and.reduce([light[..., k:k + w] for k in range(4)])
+    after = np.logical_and.reduce([light[..., 11 + k:11 + k + w] for k in range(4)])
+    return 40 * (core & (before | after)).sum(axis=(-2, -1))
+
+
+def mask_penalties_unpacked(m):
+    """mask_penalties() for (..., n, n) bool candidates of any width."""
+    n = m.shape[-1]
+    cols = np.swapaxes(m, -1, -2)
+    score = _run_penalty_unpacked(m) + _run_penalty_unpacked(cols)
+    score += _block_penalty_unpacked(m)
+    score += _finder_penalty_unpacked(m) + _finder_penalty_unpacked(cols)
+    dark = m.sum(axis=(-2, -1))
+    return score + 10 * (np.abs(dark * 20 - n * n * 10) // (n * n))
+
+
+# --- encoding ------------------------------------------------------------
+
+def _codewords_batch(payloads, version, level):
+    """Interleaved data + ecc codewords for payloads of one version."""
+    ecc, sizes = _blocks(version, level)
+    data = [data_codewords(p, version, level) for p in payloads]
+    blocks, offset = [], 0
+    for size in sizes:
+        chunk = np.array([d[offset:offset + size] for d in data], dtype=np.uint8)
+        blocks.append((chunk, QR_FIELD.ecc_batch(chunk, ecc, 0)))
+        offset += size
+
+    out = []
+    for i in range(max(sizes)):
+        out += [chunk[:, i] for chunk, _ in blocks if i < chunk.shape[1]]
+    for i in range(ecc):
+        out += [check[:, i] for _, check in blocks]
+    return np.stack(out, axis=1)
+
+
+def encode_qr_batch(payloads, level="M", skip_oversized=False):
+    """
+    Module matrices (bool, True = dark, no quiet zone) for a list of byte
+    strings, in order. A payload that doesn't fit raises ValueError, or
+    gets None with skip_oversized.
+    """
+    if level not in LEVELS:
+        raise ValueError(f"Unknown QR error correction level {level!r}")
+    by_version = {}
+    for n, p in enumerate(payloads):
+        try:
+            version = choose_version(len(p), level)
+        except ValueError:
+            if not skip_oversized:
+                raise
+            continue
+        by_version.setdefault(version, []).append(n)
+
+    out = [None] * len(payloads)
+    for version, members in by_version.items():
+        lay = layout(version)
+        codewords = _codewords_batch([payloads[n] for n in members], version, level)
+        bits = np.unpackbits(codewords, axis=1)
+        npos = len(lay.data_rows)
+        data = np.zeros((len(members), lay.size, lay.size), dtype=bool)
+        data[:, lay.data_rows, lay.data_cols] = np.pad(bits, ((0, 0), (0, npos - bits.shape[1])))[:, :npos]
+
+        # Masking only flips data modules, so packed candidates are
+        # (packed data ^ packed mask) | packed function patterns: the data
+        # is packed once per symbol, not once per mask.
+        fixed = lay.fixed_with_format(level)
+        packed = lay.size <= PACKED_MAX_SIZE
+        step = MASK_PENALTY_CHUNK if packed else max(1, MASK_PENALTY_BYTES // (8 * lay.size ** 2))
+        for start in range(0, len(members), step):
+            chunk = data[start:start + step]
+            if packed:
+                fixed_rows, fixed_cols = lay.packed_fixed(level)
+                mask_rows, mask_cols = lay.packed_masks
+                rows, cols = pack(chunk)
+                penalties = mask_penalties(
+                    (rows[:, None] ^ mask_rows[None]) | fixed_rows[None],
+                    (cols[:, None] ^ mask_cols[None]) | fixed_cols[None],
+                    lay.size,
+                )
+            else:
+                penalties = mask_penalties_unpacked((chunk[:, None] ^ lay.masks[None]) | fixed[None])
+            best = penalties.argmin(axis=1)
+            chosen = (chunk ^ lay.masks[best]) | fixed[best]
+            for k, matrix in enumerate(chosen):
+                out[members[start + k]] = matrix
+    return out
+
+
+def encode_qr(payload: bytes, level="M"):
+    return encode_qr_batch([payload], level)[0]
@@ -0,0 +1,89 @@
+# labels/symbols/reedsolomon.py
+"""
+GF(256) arithmetic and Reed–Solomon error correction for the 2D symbols.
+
+QR uses the field polynomial x^8+x^4+x^3+x^2+1 (0x11D) with generator
+roots a^0..a^(n-1); Data Matrix ECC200 uses x^8+x^5+x^3+x^2+1 (0x12D)
+with roots a^1..a^n. Log/antilog tables are built once per field and turned
+into a full 256x256 product table, so encoding is table lookups only.
+
+ecc_batch() computes the check codewords of many equal-length blocks at
+once: the LFSR division runs once per data position, as one NumPy gather
+and XOR across every block in the batch.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+
+class GaloisField:
+    def __init__(self, poly):
+        self.poly = poly
+        exp = [0] * 512
+        log = [0] * 256
+        x = 1
+        for i in range(255):
+            exp[i] = x
+            log[x] = i
+            x <<= 1
+            if x & 0x100:
+                x ^= poly
+        for i in range(255, 512):  # lets mul() skip the mod 255
+            exp[i] = exp[i - 255]
+        self.exp, self.log = exp, log
+
+        log_a = np.array(log)
+        table = np.array(exp, dtype=np.uint8)[log_a[:, None] + log_a[None, :]]
+        table[0, :] = 0
+        table[:, 0] = 0
+        self.mul_table = table
+
+    def mul(self, a, b):
+        if a == 0 or b == 0:
+            return 0
+        return self.exp[self.log[a] + self.log[b]]
+
+    @lru_cache(maxsize=64)
+    def generator(self, degree, first_root):
+        """
+        Coefficients of prod(x - a^(first_root+i)) for i < degree, highest
+        power first, without the leading 1.
+        """
+        coeffs = [0] * (degree - 1) + [1]
+        root = self.exp[first_root]
+        for _ in range(degree):
+            for j in range(degree):
+                coeffs[j] = self.mul(coeffs[j], root)
+                if j + 1 < degree:
+                    coeffs[j] ^= coeffs[j + 1]
+            root = self.mul(root, 2)
+        return tuple(coeffs)
+
+    @lru_cache(maxsize=64)
+    def _generator_products(self, degree, first_root):
+        # row f = f * generator, for every possible feedback byte f
+        gen = np.array(self.generator(degree, first_root), dtype=np.intp)
+        return self.mul_table[:, gen]
+
+    def ecc_batch(self, data, degree, first_root):
+        """
+        Check codewords for each row of `data` (uint8, blocks x data
+        length); returns a (blocks x degree) uint8 array.
+        """
+        data = np.asarray(data, dtype=np.uint8)
+        products = self._generator_products(degree, first_root)
+        rem = np.zeros((data.shape[0], degree), dtype=np.uint8)
+        for i in range(data.shape[1]):
+            feedback = data[:, i] ^ rem[:, 0]
+            rem[:, :-1] = rem[:, 1:]
+            rem[:, -1] = 0
+            rem ^= products[feedback]
+        return rem
+
+    def ecc(self, data, degree, first_root):
+        """ecc_batch for one block, as a list of ints."""
+        return self.ecc_batch([list(data)], degree, first_root)[0].tolist()
+
+
+QR_FIELD = GaloisField(0x11D)
+DATAMATRIX_FIELD = GaloisField(0x12D)
@@ -0,0 +1,43 @@
+# labels/symbols/render.py
+"""SVG and PNG output for module matrices (bool arrays, True = dark)."""
+import struct
+import zlib
+
+import numpy as np
+
+
+def to_svg(matrix, quiet, css_class=""):
+    """
+    Scalable SVG, one unit per module. Each row's dark runs become one
+    path segment, so the markup stays small for print sheets.
+    """
+    m = np.asarray(matrix, dtype=bool)
+    rows, cols = m.shape
+    padded = np.pad(m, ((0, 0), (1, 1))).astype(np.int8)
+    edges = np.diff(padded, axis=1)
+    starts_r, starts_c = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[1]
+    path = "".join(f"M{c + quiet},{r + quiet}h{e - c}v1h{c - e}z"
+                   for r, c, e in zip(starts_r.tolist(), starts_c.tolist(), ends.tolist()))
+    cls = f' class="{css_class}"' if css_class else ""
+    return (f'<svg xmlns="http://www.w3.org/2000/svg"{cls} viewBox="0 0 {cols + 2 * quiet} {rows + 2 * quiet}" '
+            f'shape-rendering="crispEdges"><rect width="100%" height="100%" fill="#fff"/>'
+            f'<path d="{path}" fill="#000"/></svg>')
+
+
+def _chunk(kind, data):
+    body = kind + data
+    return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+
+def to_png(matrix, quiet, scale=4):
+    """1-bit greyscale PNG, `scale` pixels per module."""
+    m = np.pad(np.asarray(matrix, dtype=bool), quiet)
+    pixels = np.repeat(np.repeat(~m, scale, axis=0), scale, axis=1)  # 1 = white
+    height, width = pixels.shape
+    rows = np.packbits(pixels, axis=1)
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rows], axis=1).tobytes()
+    return (b"\x89PNG\r\n\x1a\n"
+            + _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 1, 0, 0, 0, 0))
+            + _chunk(b"IDAT", zlib.compress(raw, 6))
+            + _chunk(b"IEND", b""))
@@ -1,3 +1,618 @@
-from django.test import TestCase
+import io
+import json
+import math
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+import numpy as np
+
+from accounts.models import User
+from config.db_router import ReplicaRouter
+from config.ratelimit import take_tokens
+from config.testing import AsyncViewsURLConf, QueryBudgetMixin
+from . import archive, symbols
+from .codes import DEFAULT_TEMPLATE, CodeTemplate, compile_template, gs1_check_digit, validate_code_template
+from .models import Label, LabelArchiveSegment
+from .symbols.qr import mask_penalties, mask_penalties_unpacked, pack
+from .symbols.reedsolomon import DATAMATRIX_FIELD, QR_FIELD
+
+
+@override_settings(
+    SESSION_ENGINE="django.contrib.sessions.backends.cached_db",
+    AUTH_USER_CACHE_TTL=30,
+)
+class WarmCacheRequestPathTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("warm@example.com", "pw", credits=100)
+        Label.objects.create(user=self.user, name="n", sku_type="t", category="c",
+                             unit_index=1, code="x-n-t-c-001")
+        self.client.force_login(self.user)
+
+    def test_api_list_is_single_query_when_warm(self):
+        self.client.get(reverse("labels:api_list"), secure=True)  # warm session + user
+        with self.assertNumQueries(1):
+            r = self.client.get(reverse("labels:api_list"), secure=True)
+        self.assertEqual(len(r.json()["labels"]), 1)
+
+    def test_credit_change_invalidates_cached_user(self):
+        self.client.get(reverse("labels:api_list"), secure=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("labels:api_create"), {
+                "name": "n", "units": "10", "type": "t", "category": "c",
+            }, secure=True)
+        r = self.client.get(reverse("labels:home"), secure=True)
+        self.assertContains(r, "99.00")
+
+
+@override_settings(ROOT_URLCONF=AsyncViewsURLConf)
+class AsyncWarmCacheRequestPathTests(WarmCacheRequestPathTests):
+    """The same request path through api_list_async / api_create_async."""
+
+
+@override_settings(ROOT_URLCONF=AsyncViewsURLConf)
+class AsyncLabelViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("async@example.com", "pw", credits=1)
+        self.client.force_login(self.user)
+
+    def test_create_and_list(self):
+        data = {"name": "n", "units": "10", "type": "t", "category": "c"}
+        r = self.client.post(reverse("labels:api_create"), data, secure=True)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.json()["created"]), 10)
+        self.assertEqual(r.json()["credits_left"], 0)
+        self.assertIn("X-RateLimit-Remaining", r)
+        self.assertEqual(self.client.post(reverse("labels:api_create"), data, secure=True).status_code, 402)
+        self.assertEqual(self.client.get(reverse("labels:api_create"), secure=True).status_code, 400)
+
+        r = self.client.get(reverse("labels:api_list"), {"limit": 4}, secure=True).json()
+        self.assertEqual([x["unitIndex"] for x in r["labels"]], [10, 9, 8, 7])
+        self.assertIsNotNone(r["next_before"])
+
+
+@override_settings(
+    RATE_LIMIT_ENABLED=True,
+    RATE_LIMITS={"labels": (1.0, 20), "orders": (1.0, 5)},
+    BULK_CREATE_MIN_UNITS=1000,
+)
+class CreateRateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("busy@example.com", "pw", credits=100)
+        self.client.force_login(self.user)
+
+    def create(self, units):
+        return self.client.post(reverse("labels:api_create"), {
+            "name": "n", "units": str(units), "type": "t", "category": "c",
+        }, secure=True)
+
+    def test_bucket_is_weighted_by_units(self):
+        r = self.create(15)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["X-RateLimit-Limit"], "20")
+        self.assertEqual(r["X-RateLimit-Remaining"], "5")
+
+        r = self.create(10)
+        self.assertEqual(r.status_code, 429)
+        self.assertGreaterEqual(int(r["Retry-After"]), 5)
+        self.assertEqual(Label.objects.count(), 15)
+
+    def test_request_larger_than_burst_is_rejected(self):
+        self.assertEqual(self.create(21).status_code, 400)
+
+    def test_turned_down_requests_are_not_charged(self):
+        User.objects.filter(pk=self.user.pk).update(credits=1)  # 10 labels
+        r = self.create(15)
+        self.assertEqual(r.status_code, 402)
+        self.assertEqual(r["X-RateLimit-Remaining"], "20")
+        self.assertEqual(self.client.get(reverse("labels:api_create"), secure=True).status_code, 400)
+        r = self.client.post(reverse("labels:api_create"), {"units": "15"}, secure=True)
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(self.create(10).status_code, 200)
+        self.assertEqual(self.create(10)["X-RateLimit-Remaining"], "10")  # 402 again, refunded
+
+    @override_settings(BULK_CREATE_MIN_UNITS=5, BULK_CREATE_MAX_IN_FLIGHT=1)
+    def test_bulk_slots_cap_in_flight_creates(self):
+        cache.add("slot:labels:0", 1)  # another worker holds the only slot
+        self.assertEqual(self.create(5).status_code, 429)
+        r = self.create(4)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["X-RateLimit-Remaining"], "16")  # the 429 took nothing
+        cache.delete("slot:labels:0")
+        self.assertEqual(self.create(5).status_code, 200)
+        self.assertIsNone(cache.get("slot:labels:0"))
+
+    def test_concurrent_requests_cannot_overspend(self):
+        backend = type(caches["default"])  # patched on the class: each thread has its own instance
+        real_get = backend.get
+
+        def slow_get(self, *args, **kwargs):
+            value = real_get(self, *args, **kwargs)
+            time.sleep(0.005)  # widen the read-modify-write window
+            return value
+
+        results = []
+        with mock.patch.object(backend, "get", slow_get):
+            threads = [threading.Thread(target=lambda: results.append(take_tokens("labels", 1, 3)))
+                       for _ in range(12)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(sum(allowed for allowed, _, _ in results), 6)  # 20 // 3
+
+
+class ResolveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("scan@example.com", "pw", credits=10)
+        self.client.force_login(self.user)
+        self.codes = [x["code"] for x in self.client.post(reverse("labels:api_create"), {
+            "name": "n", "units": "7", "type": "t", "category": "c",
+        }, secure=True).json()["created"]]
+
+    def resolve_json(self, body):
+        return self.client.post(reverse("labels:api_resolve"), body, content_type="application/json", secure=True)
+
+    def label_queries(self, ctx):
+        return [q["sql"] for q in ctx.captured_queries if '"labels_label"' in q["sql"]]
+
+    def test_json_body_keeps_scan_order_without_duplicates(self):
+        c = self.codes
+        r = self.resolve_json(json.dumps({"codes": [c[2], "nope", c[0], c[2], " " + c[0], ""]}))
+        self.assertEqual([f["code"] for f in r.json()["found"]], [c[2], c[0]])
+        self.assertEqual(r.json()["found"][0]["unitIndex"], 3)
+        self.assertEqual(r.json()["missing"], ["nope"])
+
+        self.assertEqual(self.resolve_json("{not json").status_code, 400)
+        self.assertEqual(self.resolve_json(json.dumps({"codes": c[0]})).status_code, 400)
+
+    @override_settings(LABELS_RESOLVE_CHUNK_SIZE=3)
+    def test_codes_are_looked_up_in_chunks(self):
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.post(reverse("labels:api_resolve"), {"codes": self.codes}, secure=True)
+        self.assertEqual([f["code"] for f in r.json()["found"]], self.codes)
+        self.assertEqual(len(self.label_queries(ctx)), 3)  # 3 + 3 + 1
+
+    @override_settings(LABELS_RESOLVE_MAX_CODES=5)
+    def test_too_many_codes(self):
+        r = self.resolve_json(json.dumps({"codes": self.codes}))
+        self.assertEqual(r.status_code, 400)
+        # the cap counts distinct codes
+        r = self.resolve_json(json.dumps({"codes": self.codes[:5] * 3}))
+        self.assertEqual(len(r.json()["found"]), 5)
+
+    def test_other_accounts_codes_are_rejected_without_a_query(self):
+        other = User.objects.create_user("other@example.com", "pw")
+        foreign = Label.objects.create(user=other, name="n", sku_type="t", category="c", unit_index=1,
+                                       code=f"{str(other.public_id)[:8]}-n-t-c-001")
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.resolve_json(json.dumps({"codes": [foreign.code]}))
+        self.assertEqual(r.json(), {"found": [], "missing": [foreign.code]})
+        self.assertEqual(self.label_queries(ctx), [])
+
+        # with the filter off the code is looked up, and still not returned
+        with override_settings(LABELS_RESOLVE_PREFIX_FILTER=False), CaptureQueriesContext(connection) as ctx:
+            r = self.resolve_json(json.dumps({"codes": [foreign.code]}))
+        self.assertEqual(r.json()["found"], [])
+        self.assertEqual(len(self.label_queries(ctx)), 1)
+
+
+    def test_codes_from_an_earlier_template_still_resolve(self):
+        User.objects.filter(pk=self.user.pk).update(code_template="{prefix}/{name}/{index:4}", credits=10)
+        cache.clear()
+        new = self.client.post(reverse("labels:api_create"), {
+            "name": "n", "units": "1", "type": "t", "category": "c",
+        }, secure=True).json()["created"][0]["code"]
+        self.user.refresh_from_db()
+        self.assertEqual(len(self.user.code_prefixes), 2)
+
+        foreign = "zzzzzzzz-n-t-c-001"
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.resolve_json(json.dumps({"codes": [self.codes[0], new, foreign]}))
+        self.assertEqual([f["code"] for f in r.json()["found"]], [self.codes[0], new])
+        self.assertEqual(len(self.label_queries(ctx)), 1)  # the foreign code never got to the DB
+
+        # accounts from before the history was kept resolve everything
+        User.objects.filter(pk=self.user.pk).update(code_prefixes=None)
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.resolve_json(json.dumps({"codes": [foreign]}))
+        self.assertEqual(r.json()["missing"], [foreign])
+        self.assertEqual(len(self.label_queries(ctx)), 1)
+
+class CodeTemplateTests(SimpleTestCase):
+    values = {"prefix": "9a44d71b", "name": "riwaaz", "type": "dress", "category": "womens"}
+
+    def test_default_template_matches_original_format(self):
+        codes = compile_template(DEFAULT_TEMPLATE).render_range(self.values, 999, 2)
+        self.assertEqual(codes, ["9a44d71b-riwaaz-dress-womens-999", "9a44d71b-riwaaz-dress-womens-1000"])
+
+    def test_ean13_check_digits(self):
+        tpl = compile_template("40063813339{index:1}{check}")
+        codes = tpl.render_range(self.values, 0, 10)
+        self.assertIn("4006381333931", codes)
+        for code in codes:
+            self.assertEqual(int(code[-1]), gs1_check_digit(code[:-1]))
+
+    def test_check_digit_with_digits_after_index(self):
+        codes = compile_template("{index:4}77{check}").render_range(self.values, 1, 200)
+        for code in codes:
+            self.assertEqual(int(code[-1]), gs1_check_digit(code[:-1]))
+
+    def test_fixed_width_overflow_and_bad_templates(self):
+        with self.assertRaises(ValueError):
+            compile_template("890{index:2}{check}").render_range(self.values, 99, 2)
+        for bad in ("{name}", "{index}{index}", "{check}{index}", "{nope}{index}", "x}{index}"):
+            with self.assertRaises(ValueError):
+                CodeTemplate(bad)
+
+    def test_account_prefix(self):
+        self.assertEqual(compile_template(DEFAULT_TEMPLATE).account_prefix("9a44d71b"), "9a44d71b-")
+        self.assertEqual(compile_template("890{index:9}{check}").account_prefix("9a44d71b"), "")
+
+    def test_check_digits_past_int64_width(self):
+        for code in compile_template("4{index:20}{check}").render_range(self.values, 98, 4):
+            self.assertEqual(int(code[-1]), gs1_check_digit(code[:-1]))
+
+    def test_template_must_separate_accounts(self):
+        validate_code_template("8901234{index:5}{check}")
+        validate_code_template("{name}-{prefix}-{index}")
+        validate_code_template("{prefix:8}{index:3}")
+        for bad in ("{name}-{index:4}", "{prefix:1}{index:3}", "{prefix:7}-{name}-{index}"):
+            with self.assertRaises(ValidationError):
+                validate_code_template(bad)
+
+
+class CodeTemplateOwnerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.first = User.objects.create_user("gs1-a@example.com", "pw", credits=10, code_template="890{index:4}{check}")
+
+    def test_overlapping_company_prefix_is_rejected(self):
+        for source in ("890{index:4}{check}", "8901{index:3}{check}", "89{index:5}{check}"):
+            other = User(email="gs1-b@example.com", code_template=source)
+            with self.assertRaises(ValidationError):
+                other.full_clean(exclude=["password"])
+        User(email="gs1-b@example.com", code_template="891{index:4}{check}").full_clean(exclude=["password"])
+
+    def test_code_collision_is_a_conflict_not_a_500(self):
+        # saved without full_clean(), as a shell or data migration might
+        second = User.objects.create_user("gs1-b@example.com", "pw", credits=10, code_template="890{index:4}{check}")
+        data = {"name": "n", "units": "5", "type": "t", "category": "c"}
+        self.client.force_login(self.first)
+        self.assertEqual(self.client.post(reverse("labels:api_create"), data, secure=True).status_code, 200)
+        self.client.force_login(second)
+        r = self.client.post(reverse("labels:api_create"), data, secure=True)
+        self.assertEqual(r.status_code, 409)
+        second.refresh_from_db()
+        self.assertEqual(second.credits, 10)  # deduction rolled back
+
+
+# the admin pages reference static files; the manifest only exists after collectstatic
+@override_settings(STORAGES={"staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}})
+class LabelAdminSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin@example.com", "pw")
+        self.client.force_login(self.admin)
+        for code, name in (("890ABC-0001", "Riwaaz Dress"), ("9a44d71b-kurta-001", "Kurta")):
+            Label.objects.create(user=self.admin, name=name, sku_type="t", category="c", unit_index=1, code=code)
+
+    def search(self, q):
+        r = self.client.get(reverse("admin:labels_label_changelist"), {"q": q}, secure=True)
+        return [x.code for x in r.context["cl"].result_list]
+
+    def test_code_and_name_prefix(self):
+        self.assertEqual(self.search("890ABC"), ["890ABC-0001"])
+        self.assertEqual(self.search("Riwaaz"), ["890ABC-0001"])
+        self.assertEqual(self.search("9a44d71b-"), ["9a44d71b-kurta-001"])
+        self.assertEqual(self.search("Dress"), [])  # prefix, not substring
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        override = override_settings(LABEL_ARCHIVE_DIR=self.tmp.name, LABEL_ARCHIVE_BLOCK_ROWS=4)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        cache.clear()
+        self.user = User.objects.create_user("old@example.com", "pw", credits=100)
+        self.client.force_login(self.user)
+        self.client.post(reverse("labels:api_create"), {
+            "name": "n", "units": "20", "type": "t", "category": "c",
+        }, secure=True)
+        Label.objects.update(created_at=timezone.now() - timedelta(days=400))
+
+    def test_archive_lookup_and_restore(self):
+        codes = list(Label.objects.order_by("unit_index").values_list("code", flat=True))
+        call_command("archive_labels", "--older-than", "365", "--batch-size", "7", stdout=io.StringIO())
+
+        # newest label of the group stays hot so numbering continues
+        self.assertEqual(list(Label.objects.values_list("code", flat=True)), [codes[-1]])
+        self.assertEqual(LabelArchiveSegment.objects.count(), 3)
+
+        r = self.client.post(reverse("labels:api_resolve"), {"codes": [codes[0], codes[10], "nope"]}, secure=True)
+        found = r.json()["found"]
+        self.assertEqual([f["code"] for f in found], [codes[0], codes[10]])
+        self.assertTrue(all(f["archived"] for f in found))
+
+        r = self.client.post(reverse("labels:api_create"), {
+            "name": "n", "units": "1", "type": "t", "category": "c",
+        }, secure=True)
+        self.assertEqual(r.json()["created"][0]["unitIndex"], 21)
+
+        self.assertEqual(archive.restore([codes[3]]), 1)
+        restored = Label.objects.get(code=codes[3])
+        self.assertEqual(restored.unit_index, 4)
+        self.assertLess(restored.created_at, timezone.now() - timedelta(days=365))
+        self.assertEqual(archive.restore([codes[3]]), 0)
+
+    def test_lookup_skips_segments_without_the_code(self):
+        codes = list(Label.objects.order_by("code").values_list("code", flat=True))
+        call_command("archive_labels", "--older-than", "365", "--batch-size", "7", stdout=io.StringIO())
+        # inside the first segment's code range; codes carry a random account
+        # prefix, so skip the ~1% the filter can't rule out
+        first = LabelArchiveSegment.objects.get(min_code=codes[0])
+        unknown = next(c for c in (f"{codes[0]}x{i}" for i in range(100)) if not archive.may_contain(first, c))
+        with mock.patch.object(archive, "_read_block", wraps=archive._read_block) as read:
+            self.assertEqual(archive.lookup([unknown]), {})
+            self.assertEqual(read.call_count, 0)
+
+            # segments from before the filter existed are read until backfilled
+            LabelArchiveSegment.objects.update(code_filter=b"")
+            self.assertEqual(archive.lookup([unknown]), {})
+            self.assertEqual(read.call_count, 1)
+            self.assertEqual(archive.backfill_code_filters(), 3)
+            read.reset_mock()
+            self.assertEqual(archive.lookup([unknown]), {})
+            self.assertEqual(read.call_count, 0)
+        self.assertEqual(set(archive.lookup(codes[:-1])), set(codes[:-1]))
+
+    def test_restore_counts_only_inserted_rows(self):
+        codes = list(Label.objects.order_by("unit_index").values_list("code", flat=True))
+        call_command("archive_labels", "--older-than", "365", stdout=io.StringIO())
+        # another label already holds codes[1]'s id: ignore_conflicts skips it
+        row = archive.lookup([codes[1]])[codes[1]]
+        Label.objects.create(id=row["id"], user=self.user, name="x", sku_type="t", category="c",
+                             unit_index=99, code="elsewhere")
+        self.assertEqual(archive.restore(codes[:3]), 2)
+
+        # re-archiving a restored label doesn't count it twice
+        call_command("archive_labels", "--older-than", "365", stdout=io.StringIO())
+        ids = [r["id"] for r in archive.iter_rows()]
+        self.assertEqual(len(ids), len(set(ids)))
+
+
+    def test_numbering_continues_past_archived_labels_after_a_template_change(self):
+        User.objects.filter(pk=self.user.pk).update(code_template="{prefix}/{name}/{index:4}")
+        cache.clear()
+        create = lambda units: self.client.post(reverse("labels:api_create"), {
+            "name": "n", "units": str(units), "type": "t", "category": "c",
+        }, secure=True).json()["created"]
+        first = create(2)
+        Label.objects.update(created_at=timezone.now() - timedelta(days=400))
+        # the old template's label 20 is the group's newest, so both new ones go
+        call_command("archive_labels", "--older-than", "365", stdout=io.StringIO())
+        self.assertFalse(Label.objects.filter(code__in=[c["code"] for c in first]).exists())
+
+        again = create(2)
+        self.assertEqual([c["unitIndex"] for c in again], [3, 4])
+        self.assertEqual(archive.lookup([c["code"] for c in again]), {})
+
+    def test_missing_segment_file_is_a_logged_miss(self):
+        codes = list(Label.objects.order_by("code").values_list("code", flat=True))
+        call_command("archive_labels", "--older-than", "365", stdout=io.StringIO())
+        for f in Path(self.tmp.name).iterdir():
+            f.unlink()
+        with self.assertLogs("labels.archive", "ERROR") as logs:
+            r = self.client.post(reverse("labels:api_resolve"), {"codes": [codes[0]]}, secure=True)
+        self.assertEqual(r.json(), {"found": [], "missing": [codes[0]]})
+        self.assertIn("durable storage", logs.output[0])
+        # a usage rebuild can't skip them without undercounting
+        with self.assertRaisesMessage(CommandError, "is missing"):
+            call_command("rebuild_usage", stdout=io.StringIO())
+
+    def test_batch_is_read_on_the_primary(self):
+        # a replica could hand back rows that have since changed on the primary
+        cutoff = timezone.now() - timedelta(days=365)
+        with mock.patch.object(ReplicaRouter, "db_for_read", wraps=ReplicaRouter().db_for_read) as route:
+            self.assertEqual(archive.archive_batch(cutoff, batch_size=7)[0], 7)
+        route.assert_not_called()
+
+    def test_failed_batch_leaves_no_segment_file(self):
+        cutoff = timezone.now() - timedelta(days=365)
+        with mock.patch.object(LabelArchiveSegment.objects, "create", side_effect=DatabaseError("boom")):
+            with self.assertRaises(DatabaseError):
+                archive.archive_batch(cutoff)
+        self.assertEqual(list(Path(self.tmp.name).iterdir()), [])
+        self.assertEqual(Label.objects.count(), 20)
+
+
+# budgets assume production's shared cache, where the user cache is on
+@override_settings(AUTH_USER_CACHE_TTL=30)
+class LabelQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("budget@example.com", "pw", credits=1000)
+        Label.objects.bulk_create([
+            Label(user=self.user, name=f"sku{i % 20}", sku_type="tee", category="men",
+                  unit_index=i, code=f"seed-{i:05d}")
+            for i in range(300)
+        ])
+        self.client.force_login(self.user)
+        self.client.get(reverse("labels:api_list"), secure=True)  # warm the user cache
+
+    def create(self, units):
+        r = self.client.post(reverse("labels:api_create"), {
+            "name": "n", "units": str(units), "type": "t", "category": "c",
+        }, secure=True)
+        self.assertEqual(r.status_code, 200)
+        return r
+
+    def test_api_list(self):
+        # session + labels
+        with self.assertMaxQueries(2):
+            self.client.get(reverse("labels:api_list"), {"name": "sku1", "type": "tee"}, secure=True)
+
+    def test_api_list_pages(self):
+        url = reverse("labels:api_list")
+        r = self.client.get(url, {"limit": 120, "type": "tee"}, secure=True).json()
+        self.assertEqual(len(r["labels"]), 120)
+        seen = [x["id"] for x in r["labels"]]
+        while r["next_before"]:
+            with self.assertMaxQueries(2):
+                r = self.client.get(url, {"limit": 120, "type": "tee", "before": r["next_before"]}, secure=True).json()
+            seen += [x["id"] for x in r["labels"]]
+        self.assertEqual(seen, sorted(Label.objects.values_list("id", flat=True), reverse=True))
+
+    def test_api_create_does_not_scale_with_units(self):
+        # session, credit UPDATE, MAX(unit_index), archive segment check,
+        # INSERT, rollup UPDATE, credits re-read, savepoint pair; the first
+        # create of the day also inserts the rollup row
+        with self.assertMaxQueries(12):
+            self.create(1)
+        with self.assertMaxQueries(9):
+            self.create(1)
+        with self.assertMaxQueries(9):
+            r = self.create(100)
+        self.assertEqual(len({row["id"] for row in r.json()["created"]}), 100)
+
+        # past one INSERT batch (backend parameter limit), one more per batch
+        fields = [f for f in Label._meta.concrete_fields if not f.primary_key]
+        units = 1000
+        batches = math.ceil(units / connection.ops.bulk_batch_size(fields, [None] * units))
+        with self.assertMaxQueries(8 + batches):
+            self.create(units)
+
+
+@override_settings(ROOT_URLCONF=AsyncViewsURLConf)
+class AsyncLabelQueryBudgetTests(LabelQueryBudgetTests):
+    """api_list_async / api_create_async keep the sync views' budgets."""
+
+
+@tag("perf")
+class LabelLatencyBudgetTests(QueryBudgetMixin, TestCase):
+    """Wall-clock budgets on a scaled dataset (`manage.py test --exclude-tag perf` skips them)."""
+
+    ROWS = 20_000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("scaled@example.com", "pw", credits=10_000)
+        other = User.objects.create_user("other@example.com", "pw")
+        Label.objects.bulk_create([
+            Label(user=cls.user if i % 5 else other, name=f"sku{i % 500}",
+                  sku_type=("tee", "dress", "kurta")[i % 3], category=f"cat{i % 7}",
+                  unit_index=i, code=f"seed-{i:06d}")
+            for i in range(cls.ROWS)
+        ], batch_size=5000)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.client.get(reverse("labels:api_list"), secure=True)
+
+    def test_api_list(self):
+        with self.assertWithinBudget(0.15):
+            self.client.get(reverse("labels:api_list"), secure=True)
+        with self.assertWithinBudget(0.15):
+            self.client.get(reverse("labels:api_list"), {"name": "sku49", "category": "cat3"}, secure=True)
+
+    def test_api_create(self):
+        with self.assertWithinBudget(0.5):
+            r = self.client.post(reverse("labels:api_create"), {
+                "name": "sku1", "units": "2000", "type": "tee", "category": "cat1",
+            }, secure=True)
+        self.assertEqual(len(r.json()["created"]), 2000)
+
+
+class SymbolTests(SimpleTestCase):
+    def test_reed_solomon_reference_vectors(self):
+        # ISO/IEC 18004 Annex I ("01234567", 1-M) and ISO/IEC 16022 ("123456", 10x10)
+        qr_data = [0x10, 0x20, 0x0C, 0x56, 0x61, 0x80] + [0xEC, 0x11] * 5
+        self.assertEqual(QR_FIELD.ecc(qr_data, 10, 0),
+                         [0xA5, 0x24, 0xD4, 0xC1, 0xED, 0x36, 0xC7, 0x87, 0x2C, 0x55])
+        self.assertEqual(DATAMATRIX_FIELD.ecc([142, 164, 186], 5, 1), [114, 25, 5, 88, 102])
+
+    def test_batch_matches_one_at_a_time(self):
+        payloads = [f"9a44d71b-riwaaz-dress-womens-{i:03d}\nRiwaaz\nDress\nWomens\n{i}" for i in range(40)]
+        payloads.append("x" * 150)  # a larger version in the same batch
+        for fmt in symbols.FORMATS:
+            batch = symbols.encode_batch(fmt, payloads)
+            for p, m in zip(payloads, batch):
+                self.assertTrue((m == symbols.encode_batch(fmt, [p])[0]).all())
+
+    def test_symbol_shapes_and_limits(self):
+        self.assertEqual(symbols.encode_datamatrix(b"123456").shape, (10, 10))
+        self.assertEqual(symbols.encode_qr(b"hello").shape, (21, 21))
+        self.assertEqual(symbols.encode_qr(b"x" * 600).shape, (93, 93))  # version 19-M
+        self.assertEqual(symbols.encode_qr(b"x" * 2331).shape, (177, 177))  # version 40-M
+        with self.assertRaises(ValueError):
+            symbols.encode_qr(b"x" * 2332)
+        with self.assertRaises(ValueError):
+            symbols.encode_datamatrix(b"x" * 817)
+        self.assertEqual(symbols.encode_batch("qr", [b"x" * 2332, b"ok"], skip_oversized=True)[0], None)
+        self.assertTrue(symbols.to_png(symbols.encode_qr(b"hello"), 4).startswith(b"\x89PNG"))
+
+    def test_packed_and_unpacked_mask_penalties_agree(self):
+        rng = np.random.default_rng(0)
+        for n in (21, 45, 60):
+            m = rng.random((8, n, n)) < 0.5
+            self.assertEqual(mask_penalties(*pack(m), n).tolist(), mask_penalties_unpacked(m).tolist())
+
+
+class SymbolViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("sym@example.com", "pw", credits=100)
+        other = User.objects.create_user("other@example.com", "pw")
+        self.mine = Label.objects.create(user=self.user, name="n", sku_type="t", category="c",
+                                         unit_index=1, code="x-n-t-c-001")
+        self.theirs = Label.objects.create(user=other, name="n", sku_type="t", category="c",
+                                           unit_index=1, code="y-n-t-c-001")
+        self.client.force_login(self.user)
+
+    def test_api_symbols_only_for_own_labels(self):
+        r = self.client.post(reverse("labels:api_symbols"),
+                             {"format": "datamatrix", "ids": [self.mine.id, self.theirs.id]},
+                             content_type="application/json", secure=True)
+        self.assertEqual(list(r.json()["symbols"]), [str(self.mine.id)])
+        self.assertTrue(r.json()["symbols"][str(self.mine.id)].startswith("<svg"))
+
+        r = self.client.post(reverse("labels:api_symbols"), {"format": "pdf417", "ids": [self.mine.id]},
+                             content_type="application/json", secure=True)
+        self.assertEqual(r.status_code, 400)
+
+    def test_api_symbols_skips_labels_too_long_for_the_format(self):
+        # non-ASCII costs Data Matrix two codewords per UTF-8 byte: 160 chars -> 960
+        big = Label.objects.create(user=self.user, name="ड" * 120, sku_type="kurta-set", category="ब" * 40,
+                                   unit_index=1, code="x-big-t-c-001")
+        r = self.client.post(reverse("labels:api_symbols"),
+                             {"format": "datamatrix", "ids": [self.mine.id, big.id]},
+                             content_type="application/json", secure=True)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(list(r.json()["symbols"]), [str(self.mine.id)])
+        self.assertEqual(list(r.json()["errors"]), [str(big.id)])
+
+    def test_label_symbol_download(self):
+        r = self.client.get(reverse("labels:label_symbol", args=[self.mine.id, "png"]), {"format": "qr"}, secure=True)
+        self.assertEqual(r["Content-Type"], "image/png")
+        r = self.client.get(reverse("labels:label_symbol", args=[self.theirs.id, "svg"]), secure=True)
+        self.assertEqual(r.status_code, 404)
@@ -1,10 +1,17 @@
 # labels/urls.py
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# ASGI deployments serve the native async variants
+_async = settings.ASYNC_VIEWS
+
 app_name = "labels"
 urlpatterns = [
     path("", views.home, name="home"),
-    path("api/list/", views.api_list, name="api_list"),
-    path("api/create/", views.api_create, name="api_create"),
+    path("api/list/", views.api_list_async if _async else views.api_list, name="api_list"),
+    path("api/create/", views.api_create_async if _async else views.api_create, name="api_create"),
+    path("api/resolve/", views.api_resolve, name="api_resolve"),
+    path("api/symbols/", views.api_symbols, name="api_symbols"),
+    path("labels/<int:pk>/symbol.<str:ext>", views.label_symbol, name="label_symbol"),
 ]
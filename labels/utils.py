@@ -1,12 +1,17 @@
 # labels/utils.py
 import re
 
+_WS = re.compile(r"\s+")
+_UNSAFE = re.compile(r"[^a-z0-9\-]")
+_DASHES = re.compile(r"-{2,}")
+
 def slug(s: str) -> str:
     s = s.strip().lower()
-    s = re.sub(r"\s+", "-", s)
-    s = re.sub(r"[^a-z0-9\-]", "", s)
-    s = re.sub(r"-{2,}", "-", s)
+    s = _WS.sub("-", s)
+    s = _UNSAFE.sub("", s)
+    s = _DASHES.sub("-", s)
     return s
 
-def pad(n: int, w: int = 3) -> str:
-    return str(n).zfill(w)
+def chunked(seq, size: int):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
@@ -1,77 +1,321 @@
 # labels/views.py
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.db import transaction
-from django.db.models import Max, Q
-from django.http import JsonResponse, HttpResponseBadRequest
-from django.shortcuts import render
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Q
+from django.http import HttpResponse, JsonResponse, HttpResponseBadRequest
+from django.shortcuts import get_object_or_404, render
+from django.views.decorators.http import require_POST
+from accounts.backends import forget_cached_user
+from accounts.usage import record_usage
+from config.ratelimit import rate_limited, units_cost
+from . import archive
 from .models import Label
-from .utils import slug, pad
-from decimal import Decimal
+from .codes import issued_prefixes, template_for, template_values
+from .utils import chunked
+from decimal import ROUND_DOWN, Decimal
 
 @login_required
 def home(request):
     return render(request, "labels/home.html")
 
-@login_required
-def api_list(request):
-    qn = request.GET.get("name","").lower()
-    qt = request.GET.get("type","").lower()
-    qc = request.GET.get("category","").lower()
-    qs = Label.objects.filter(user=request.user)
+LIST_PAGE_MAX = 1000
+
+def _filtered_labels(user, params):
+    """
+    One newest-first page of the user's labels. ?before=<id> continues
+    below that id (keyset, so deep pages cost the same as the first);
+    ?limit= sets the page size, up to LIST_PAGE_MAX. Fetches one extra
+    row so the caller can tell whether another page follows.
+    """
+    qn = params.get("name","").lower()
+    qt = params.get("type","").lower()
+    qc = params.get("category","").lower()
+    qs = Label.objects.filter(user=user)
     if qn: qs = qs.filter(Q(name__icontains=qn) | Q(code__icontains=qn))
     if qt: qs = qs.filter(sku_type__icontains=qt)
     if qc: qs = qs.filter(category__icontains=qc)
-    qs = qs.order_by("-id")[:1000]
-    data = [{
+    before = params.get("before", "")
+    if before.isdigit():
+        qs = qs.filter(id__lt=int(before))
+    try:
+        limit = min(LIST_PAGE_MAX, max(1, int(params.get("limit") or LIST_PAGE_MAX)))
+    except ValueError:
+        limit = LIST_PAGE_MAX
+    return qs.order_by("-id")[:limit + 1], limit
+
+def _label_json(x):
+    return {
         "id": x.id,
         "name": x.name,
         "type": x.sku_type,
         "category": x.category,
         "unitIndex": x.unit_index,
         "code": x.code,
-    } for x in qs]
-    return JsonResponse({"labels": data})
+    }
+
+def _list_response(rows, limit):
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return JsonResponse({
+        "labels": [_label_json(x) for x in rows],
+        "next_before": rows[-1].id if more else None,
+    })
 
 @login_required
-def api_create(request):
-    if request.method != "POST":
-        return HttpResponseBadRequest("POST only")
-    name = request.POST.get("name","").strip()
-    units = int(request.POST.get("units","0") or 0)
-    sku_type = request.POST.get("type","").strip()
-    category = request.POST.get("category","").strip()
+def api_list(request):
+    qs, limit = _filtered_labels(request.user, request.GET)
+    return _list_response(list(qs), limit)
+
+@login_required
+async def api_list_async(request):
+    user = await request.auser()
+    qs, limit = _filtered_labels(user, request.GET)
+    return _list_response([x async for x in qs], limit)
+
+@login_required
+@require_POST
+def api_resolve(request):
+    """
+    Exact-code lookup for warehouse scanners.
+    Accepts JSON {"codes": [...]} or repeated form field `codes`, resolves
+    them through the unique `code` index in chunked IN queries.
+    """
+    if request.content_type == "application/json":
+        try:
+            codes = json.loads(request.body or b"{}").get("codes") or []
+        except (ValueError, AttributeError):
+            return HttpResponseBadRequest("Invalid JSON")
+        if not isinstance(codes, list):
+            return HttpResponseBadRequest("codes must be a list")
+    else:
+        codes = request.POST.getlist("codes")
+
+    # de-dupe while keeping scan order
+    codes = list(dict.fromkeys(str(c).strip() for c in codes if str(c).strip()))
+    if len(codes) > settings.LABELS_RESOLVE_MAX_CODES:
+        return HttpResponseBadRequest(f"Too many codes (max {settings.LABELS_RESOLVE_MAX_CODES})")
+
+    # every code we issue for this account carries one of its prefixes, so
+    # anything else can be rejected without a DB round-trip
+    prefixes = issued_prefixes(request.user) if settings.LABELS_RESOLVE_PREFIX_FILTER else None
+    if prefixes:
+        lookup = [c for c in codes if c.startswith(prefixes)]
+    else:
+        lookup = codes
+
+    found = {}
+    for chunk in chunked(lookup, settings.LABELS_RESOLVE_CHUNK_SIZE):
+        rows = (Label.objects
+                .filter(user=request.user, code__in=chunk)
+                .values_list("id", "name", "sku_type", "category", "unit_index", "code"))
+        for id_, name, sku_type, category, unit_index, code in rows:
+            found[code] = {
+                "id": id_,
+                "name": name,
+                "type": sku_type,
+                "category": category,
+                "unitIndex": unit_index,
+                "code": code,
+            }
+
+    # codes not in the hot table may have been archived
+    missing = [c for c in lookup if c not in found]
+    if missing:
+        for code, row in archive.lookup(missing, user=request.user).items():
+            found[code] = {
+                "id": row["id"],
+                "name": row["name"],
+                "type": row["sku_type"],
+                "category": row["category"],
+                "unitIndex": row["unit_index"],
+                "code": code,
+                "archived": True,
+            }
+
+    return JsonResponse({
+        "found": [found[c] for c in codes if c in found],
+        "missing": [c for c in codes if c not in found],
+    })
+
+def _create_payload(post):
+    name = post.get("name","").strip()
+    units = int(post.get("units","0") or 0)
+    sku_type = post.get("type","").strip()
+    category = post.get("category","").strip()
     if not (name and units > 0 and sku_type and category):
-        return HttpResponseBadRequest("Invalid payload")
-    
-    # Check credits
+        return None
+    return name, units, sku_type, category
+
+def _split_charge(total, units):
+    """Per-label shares of `total` (4 places) that add back up to it exactly."""
+    share = (total / units).quantize(Decimal("0.0001"), rounding=ROUND_DOWN)
+    return [total - share * (units - 1)] + [share] * (units - 1)
+
+def _remember_prefix(user, prefix):
+    """Record `prefix` in user.code_prefixes; the caller holds the user row."""
+    if user.code_prefixes is None or prefix in user.code_prefixes:
+        return
+    # the user may come from the cache; the list only grows, so re-read it
+    user.refresh_from_db(fields=["code_prefixes"])
+    if user.code_prefixes is not None and prefix not in user.code_prefixes:
+        user.code_prefixes = [*user.code_prefixes, prefix]
+        get_user_model().objects.filter(pk=user.pk).update(code_prefixes=user.code_prefixes)
+
+def _create_labels(user, name, units, sku_type, category):
+    """
+    Deduct credits and insert `units` labels in one transaction.
+    Returns (created, credits_left), or None when credits are short.
+    Raises ValueError when the indexes overflow a fixed-width template.
+    """
     credits_needed = Decimal(units) / Decimal(10)  # 1 credit = 10 labels
-    if request.user.credits < credits_needed:
-        return JsonResponse({"error": "Not enough credits. Please buy more."}, status=402)
 
-    # Build a base that includes the user's public_id for GLOBAL uniqueness
-    user_prefix = str(getattr(request.user, "public_id", request.user.id))
-    base = f"{user_prefix[:8]}-{slug(name)}-{slug(sku_type)}-{slug(category)}-"
+    template = template_for(user)
+    values = template_values(user, name, sku_type, category)
+    # Codes sharing everything before {index} continue one numbering
+    base = template.sequence_prefix(values)
 
     with transaction.atomic():
+        # Check + deduct credits in one statement on the primary; the user
+        # may have been loaded from a replica and be slightly stale.
+        deducted = (get_user_model().objects
+                    .filter(pk=user.pk, credits__gte=credits_needed)
+                    .update(credits=F("credits") - credits_needed))
+        if not deducted:
+            return None
+        _remember_prefix(user, template.account_prefix(values["prefix"]))
+
         # Continue numbering per-user per (name,type,category) trio
         max_idx = (Label.objects
-                   .filter(user=request.user, code__startswith=base)
+                   .filter(user=user, code__startswith=base)
                    .aggregate(Max("unit_index"))["unit_index__max"]) or 0
-        created = []
-        for i in range(1, units+1):
-            idx = max_idx + i
-            code = f"{base}{pad(idx)}"
-            obj = Label.objects.create(
-                user=request.user, name=name, sku_type=sku_type,
-                category=category, unit_index=idx, code=code
-            )
-            created.append({"id": obj.id, "code": code, "unitIndex": idx})
-        
-        # Deduct credits
-        request.user.credits = request.user.credits - credits_needed
-        request.user.save(update_fields=["credits"])
+        codes = template.render_range(values, max_idx + 1, units)
+        if archive.lookup(codes):
+            # this numbering's newest labels were archived while another
+            # template's stayed hot (see labels/archive.py); continue after them
+            max_idx = max(max_idx, archive.max_archived_index(base))
+            codes = template.render_range(values, max_idx + 1, units)
+        # One multi-row INSERT per backend batch; ids come back through
+        # RETURNING (PostgreSQL, SQLite >= 3.35)
+        objs = Label.objects.bulk_create([
+            Label(user=user, name=name, sku_type=sku_type,
+                  category=category, unit_index=idx, code=code, credits_charged=charge)
+            for idx, (code, charge) in enumerate(zip(codes, _split_charge(credits_needed, units)),
+                                                 start=max_idx + 1)
+        ])
+        created = [{"id": obj.id, "code": obj.code, "unitIndex": obj.unit_index} for obj in objs]
+
+        record_usage(user.pk, labels=units, spent=credits_needed)
+        user.refresh_from_db(fields=["credits"])
+        transaction.on_commit(lambda: forget_cached_user(user.pk))
+
+    return created, user.credits
 
+# Another account's codes already took the rendered range (e.g. two accounts
+# on overlapping templates); the transaction rolled the credit deduction back
+_CODE_CONFLICT = {"error": "Label codes collide with existing labels; check the account's code template."}
+
+def _create_response(result):
+    if result is None:
+        return JsonResponse({"error": "Not enough credits. Please buy more."}, status=402)
+    created, credits_left = result
     return JsonResponse({
         "created": created,
-        "credits_left": float(request.user.credits)  # float so JSON is safe
+        "credits_left": float(credits_left)  # float so JSON is safe
     })
+
+@login_required
+@rate_limited("labels", cost=units_cost)
+def api_create(request):
+    if request.method != "POST":
+        return HttpResponseBadRequest("POST only")
+    payload = _create_payload(request.POST)
+    if payload is None:
+        return HttpResponseBadRequest("Invalid payload")
+    try:
+        result = _create_labels(request.user, *payload)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    except IntegrityError:
+        return JsonResponse(_CODE_CONFLICT, status=409)
+    return _create_response(result)
+
+@login_required
+@rate_limited("labels", cost=units_cost)
+async def api_create_async(request):
+    if request.method != "POST":
+        return HttpResponseBadRequest("POST only")
+    payload = _create_payload(request.POST)
+    if payload is None:
+        return HttpResponseBadRequest("Invalid payload")
+    user = await request.auser()
+    # transaction.atomic() has no async form yet; run the write path in
+    # the thread that owns this request's DB connection
+    try:
+        result = await sync_to_async(_create_labels)(user, *payload)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    except IntegrityError:
+        return JsonResponse(_CODE_CONFLICT, status=409)
+    return _create_response(result)
+
+def _symbol_payload(label):
+    """What a 2D symbol carries: the code, then the SKU fields, one per line."""
+    return "\n".join([label.code, label.name, label.sku_type, label.category, str(label.unit_index)])
+
+@login_required
+@require_POST
+def api_symbols(request):
+    """
+    QR / Data Matrix SVGs for the print sheet.
+    JSON {"format": "qr"|"datamatrix", "ids": [...]} ->
+    {"symbols": {id: svg}, "errors": {id: message}}; the whole request is
+    encoded as one batch, and a label too long for the format only costs
+    its own symbol.
+    """
+    from . import symbols  # NumPy only loads in processes that draw symbols
+
+    try:
+        body = json.loads(request.body or b"{}")
+        fmt, ids = body.get("format"), [int(i) for i in body.get("ids") or []]
+    except (ValueError, TypeError, AttributeError):
+        return HttpResponseBadRequest("Invalid JSON")
+    if fmt not in symbols.FORMATS:
+        return HttpResponseBadRequest(f"format must be one of {', '.join(symbols.FORMATS)}")
+    if len(ids) > LIST_PAGE_MAX:
+        return HttpResponseBadRequest(f"Too many labels (max {LIST_PAGE_MAX})")
+
+    labels = list(Label.objects.filter(user=request.user, id__in=ids))
+    matrices = symbols.encode_batch(fmt, [_symbol_payload(x) for x in labels], skip_oversized=True)
+    quiet = symbols.quiet_zone(fmt)
+    return JsonResponse({
+        "symbols": {x.id: symbols.to_svg(m, quiet, css_class="barcode")
+                    for x, m in zip(labels, matrices) if m is not None},
+        "errors": {x.id: f"Too much data for a {fmt} symbol"
+                   for x, m in zip(labels, matrices) if m is None},
+    })
+
+@login_required
+def label_symbol(request, pk, ext):
+    """One label's symbol as a download: /labels/<id>/symbol.svg|png?format=qr|datamatrix"""
+    from . import symbols
+
+    fmt = request.GET.get("format", "qr")
+    if fmt not in symbols.FORMATS or ext not in ("svg", "png"):
+        return HttpResponseBadRequest("Unknown format")
+    label = get_object_or_404(Label, pk=pk, user=request.user)
+    try:
+        matrix = symbols.encode_batch(fmt, [_symbol_payload(label)])[0]
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    quiet = symbols.quiet_zone(fmt)
+    if ext == "svg":
+        return HttpResponse(symbols.to_svg(matrix, quiet), content_type="image/svg+xml")
+    try:
+        scale = min(32, max(1, int(request.GET.get("scale", "8"))))
+    except ValueError:
+        scale = 8
+    return HttpResponse(symbols.to_png(matrix, quiet, scale), content_type="image/png")